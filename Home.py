@@ -1,38 +1,147 @@
 import streamlit as st
-import pandas as pd
-from src.setup import get_players
-from src.metrics import *
+# The analytics modules below only build on pandas, numpy and src.metrics, which the first table needs anyway, and add
+# about 2 ms together, so they are imported with the page; Pillow and pyarrow are imported where they are used
+from src.setup import build_position_index, display_data_as_table, display_header, get_players
+from src.metrics import (FORM_WINDOW, PLAYER_TOTAL_COLUMNS, calculate_player_form, calculate_team_form, compute_player_totals,
+                         lookup_player_totals, rolling_totals, summarize_player_season, summarize_player_week, summarize_season,
+                         summarize_week)
+from src.drives import DRIVE_COLUMNS, drive_table, summarize_drives
+from src.sketches import build_yardage_sketches, merge_sketches, summarize_yardage
+from src.splits import MAX_DISTANCE, SPLIT_COLUMNS, build_split_cubes, compare_split, split_totals
+from src.live import REFRESH_SECONDS, EventFeed, apply_events, events_path, live_baseline
+from src.lineups import GROUPS, encode_lineups, lineup_analytics, lineup_roster, lineup_totals
+from src.profiling import profiled, span
+from src.report_cache import cached_report
+from src.schema import METRIC_COLUMNS
+from src.storage import list_seasons, load_team_stats, open_season
+from src.aggregates import load_weekly_aggregates
+
+# The cached functions below take the season and the store's data version as arguments, so they
+# are recomputed exactly when a play of that season is added, deleted or edited, and reused otherwise.
+# Only the selected season's partitions are ever read.
+
+# Function to get the data version of a season
+def get_data_version(season):
+    return open_season(season).version()
 
 # Function to load data
-@st.cache_data
-def load_data():
-    return pd.read_csv('team_stats.csv')
+# (the loaders are timed inside the cache, so the Diagnostics page counts the actual loads, not cache hits)
+@st.cache_data(max_entries=2)
+@profiled
+def load_data(season, version):
+    # Only the columns the metrics use are read from the store
+    data, load_report = load_team_stats(open_season(season), columns=METRIC_COLUMNS)
+    return data
 
-def main():
-    # Page configuration
-    st.set_page_config(page_title="LA Clams Stats", page_icon="🏈")
-    hide_menu_style = """
-    <style>
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    </style>
-    """
-    st.markdown(hide_menu_style, unsafe_allow_html=True)
+# Function to parse the lineups once per load
+@st.cache_data(max_entries=2)
+@profiled
+def load_position_index(season, version):
+    return build_position_index(load_data(season, version))
 
-    # Display the header and logo
-    display_header()
+# Function to read the per-week totals kept up to date by Admin, without reading the plays
+@st.cache_data(max_entries=2)
+@profiled
+def load_weekly_totals(season, version):
+    return load_weekly_aggregates(open_season(season))
 
-    # Load the data
-    data = load_data()  # Make sure to define this function to load your data
+# Function to compute every player's totals once per load
+@st.cache_data(max_entries=4)
+@profiled
+def load_player_totals(season, version, by_week=False):
+    return compute_player_totals(load_data(season, version), load_position_index(season, version), by_week)
 
-    # Display the season title
-    st.subheader("🍁 Fall 2023 Season 🍁")
+# Function to keep every player's last-N-games totals, moving the window over the season's games once per load
+@st.cache_data(max_entries=4)
+@profiled
+def load_player_form(season, version, window):
+    weeks = load_weekly_totals(season, version).index
+    return rolling_totals(load_player_totals(season, version, by_week=True), window, weeks=weeks)
+
+# Function to split the season's plays into drives once per load, reading only the columns that needs
+@st.cache_data(max_entries=2)
+@profiled
+def load_drives(season, version):
+    data, load_report = load_team_stats(open_season(season), columns=DRIVE_COLUMNS)
+    return drive_table(data)
 
-    # Get weeks with data and calculate total stats and season averages
-    weeks_with_data = data['Week'].unique()
-    calculate_season_statistics(data)
+# Function to total every stat per situation once per load, so the split filters only add up cells
+@st.cache_data(max_entries=2)
+@profiled
+def load_split_cubes(season, version):
+    data, load_report = load_team_stats(open_season(season), columns=SPLIT_COLUMNS)
+    return build_split_cubes(data)
 
-    # Individual game statistics section
+# Function to encode every play's lineup as a bitmask over the roster once per load
+@st.cache_data(max_entries=2)
+@profiled
+def load_lineups(season, version):
+    position_index = load_position_index(season, version)
+    roster = lineup_roster(position_index, get_players())
+    return encode_lineups(load_data(season, version), position_index, roster), roster
+
+# Function to count every side's, player's and lineup's plays per yardage and week once per load; the season
+# and player views merge these per-week sketches instead of sorting the plays' yardage again
+@st.cache_data(max_entries=2)
+@profiled
+def load_yardage_sketches(season, version):
+    masks, roster = load_lineups(season, version)
+    return build_yardage_sketches(load_data(season, version), masks)
+
+# Function to rank the players, pairs or units once per load, so changing the filters only filters
+@st.cache_data(max_entries=6)
+@profiled
+def load_lineup_analytics(season, version, size):
+    masks, roster = load_lineups(season, version)
+    sketches = merge_sketches(load_yardage_sketches(season, version)['Lineup'], 'Lineup')
+    return lineup_analytics(lineup_totals(load_data(season, version), masks), roster, size, sketches)
+
+# Function to share one reader of a store's live events between every session of the server
+@st.cache_resource
+def get_event_feed(path):
+    return EventFeed(path)
+
+# Live scoreboard: reruns on its own every REFRESH_SECONDS and applies the plays published since,
+# without reloading the plays or the rest of the page
+@st.fragment(run_every=REFRESH_SECONDS)
+def live_scoreboard(season):
+    store = open_season(season)
+    feed = get_event_feed(events_path(store))
+    live = st.session_state.get('live')
+    events = None
+    if live is not None and live['season'] == season:
+        events, position = feed.since(live['position'])
+    if events is None:
+        # First run, another season, or too far behind the feed: start from the saved totals, read without the lock
+        position, weekly_totals, version = live_baseline(store, feed)
+        live = {'season': season, 'version': version, 'week': weekly_totals.index.max() if len(weekly_totals) else None}
+    else:
+        weekly_totals = apply_events(live['weekly_totals'], events, live['version'])
+        # Follow the week the scorekeepers are entering
+        for event in events:
+            for play in event['added'] or event['removed']:
+                live['week'] = play['Week']
+    live.update(position=position, weekly_totals=weekly_totals)
+    st.session_state.live = live
+
+    week = live['week']
+    if week not in weekly_totals.index:
+        # The week's plays were all undone or deleted: fall back to the latest week
+        if not len(weekly_totals):
+            st.info("Waiting for the first play of the game...")
+            return
+        week = weekly_totals.index.max()
+    week_totals = weekly_totals.loc[week]
+    st.markdown(f"#### Live: Week {week} vs {week_totals['Opponent']}")
+    clams_column, opponent_column, plays_column = st.columns(3)
+    clams_column.metric('LA Clams', int(week_totals['LA Clams Points']))
+    opponent_column.metric(str(week_totals['Opponent']), int(week_totals['Opponent Points']))
+    plays_column.metric('Plays', int(week_totals['Plays']))
+    display_data_as_table(summarize_week(week, week_totals))
+
+# Individual game statistics section
+@st.fragment
+def game_statistics(season, version, weekly_totals):
     st.subheader("Individual Game Statistics")
 
     # Week selection dropdown
@@ -40,43 +149,185 @@ def main():
     week_number = int(week_selection.split(' ')[1])
 
     # Check if data for the selected week exists
-    if week_number in weeks_with_data:
-        week_data = data[data['Week'] == week_number]
-        weekly_stats = calculate_weekly_statistics(week_data, week_number)
+    if week_number in weekly_totals.index:
+        display_data_as_table(cached_report('week', lambda: summarize_week(week_number, weekly_totals.loc[week_number]),
+                                            season, version, week=week_number))
     else:
         # Display error message if no data for the selected week
         st.error(f"No stats available for {week_selection}. Please select another week.")
 
-    #####################################################
-    
-    # Sort player names in alphabetical order
-    sorted_player_names = sorted(get_players())
+# Drives section: every possession of the season or of one week
+@st.fragment
+def drive_statistics(season, version, weeks_with_data):
+    st.subheader("Drives")
+
+    scope = st.selectbox('Drives of:', ['Whole season', *[f'Week {week}' for week in weeks_with_data]], key='drive_scope')
+    drives = load_drives(season, version)
+    week = None
+    if scope != 'Whole season':
+        week = int(scope.split(' ')[1])
+        drives = drives[drives['Week'] == week]
 
+    display_data_as_table(cached_report('drives', lambda: summarize_drives(drives), season, version, week=week))
+    st.dataframe(drives, hide_index=True)
+
+# Individual player stats section
+@st.fragment
+def player_statistics(season, version, sorted_player_names):
     st.subheader("Individual Player Stats")
-    
+
     # Dropdown to select a player
     selected_player = st.selectbox('Select a player', sorted_player_names)
-    
-    # Display the stats
-    st.subheader(f'Season stats for {selected_player}')
 
-    # Get the average statistics for the selected player
-    calculate_average_stats(data, selected_player)
+    # Display the season averages of the selected player
+    st.subheader(f'Season stats for {selected_player}')
+    display_data_as_table(cached_report(
+        'player season', lambda: summarize_player_season(lookup_player_totals(load_player_totals(season, version), selected_player)),
+        season, version, player=selected_player))
 
+# Per-game player stats section
+@st.fragment
+def player_game_statistics(season, version, weeks_with_data, sorted_player_names):
     st.subheader("Per-game player stats")
 
     # Dropdown to select the week
-    week = st.selectbox('Select Week', options=data['Week'].unique())
+    week = st.selectbox('Select Week', options=weeks_with_data)
 
     # Dropdown to select the player
     selected_player = st.selectbox('Select Player', options=sorted_player_names)
 
     # Display the stats in the app
     st.write(f"Stats for {selected_player} in week {week}:")
+    display_data_as_table(cached_report(
+        'player week', lambda: summarize_player_week(lookup_player_totals(load_player_totals(season, version, by_week=True), (week, selected_player))),
+        season, version, week=week, player=selected_player))
+
+# Situational splits section
+@st.fragment
+def situational_splits(season, version, sorted_player_names):
+    st.subheader("Situational Splits")
+
+    # Stats in the chosen downs, distances, halves and opponents, next to the same stats over the whole season
+    team_cube, player_cube = load_split_cubes(season, version)
+    subject = st.selectbox('Stats of', ['Team', *sorted_player_names], key='split_subject')
+    downs = st.multiselect('Down', [1, 2, 3, 4], key='split_downs')
+    distance = st.slider('Yards to go', 0, MAX_DISTANCE, (0, MAX_DISTANCE), key='split_distance',
+                         help=f"{MAX_DISTANCE} stands for {MAX_DISTANCE} or more yards to go")
+    halves = st.multiselect('Half', sorted(team_cube.index.unique('Half')), key='split_halves')
+    opponents = st.multiselect('Opponent', sorted(team_cube.index.unique('Opponent')), key='split_opponents')
 
-    # Calculate stats for the selected player and week
-    calculate_individual_player_stats(data, week, selected_player)
+    cube, player = (team_cube, None) if subject == 'Team' else (player_cube, subject)
+    split = split_totals(cube, downs, distance, halves, opponents, player)
+    st.dataframe(compare_split(split, split_totals(cube, player=player)), hide_index=True)
 
+# Yardage distribution section
+@st.fragment
+def yardage_distribution(season, version, weeks_with_data, sorted_player_names):
+    st.subheader("Yardage Distribution")
+
+    # Medians, percentiles and explosive plays of a side's or a player's yardage, over a week or the season
+    sides = {'LA Clams offense': 'Offense', 'Opponent offense': 'Defense'}
+    subject = st.selectbox('Yardage of', [*sides, *sorted_player_names], key='yardage_subject')
+    scope = st.selectbox('Over', ['Whole season', *[f'Week {week}' for week in weeks_with_data]], key='yardage_scope')
+    week = None if scope == 'Whole season' else int(scope.split(' ')[1])
+
+    kind, key = ('Team', sides[subject]) if subject in sides else ('Player', subject)
+    sketches = load_yardage_sketches(season, version)[kind]
+    # The chosen weeks' sketches of the side or player, merged into one
+    rows = sketches.index.get_level_values(1) == key
+    if week is not None:
+        rows &= sketches.index.get_level_values('Week') == week
+    sketch = merge_sketches(sketches[rows])
+    display_data_as_table(cached_report('yardage', lambda: summarize_yardage(sketch), season, version, week=week, player=subject))
+    if sketch.sum():
+        st.bar_chart(sketch[sketch > 0].rename('Plays'), x_label='Yards', y_label='Plays')
+
+# Recent form section
+@st.fragment
+def recent_form(season, version, weekly_totals, sorted_player_names):
+    st.subheader("Recent Form")
+
+    # Trend lines of per-game averages over the last N games, as of each week
+    window = st.number_input('Last N games:', min_value=1, max_value=10, value=FORM_WINDOW, key='form_window')
+    team_stats = st.multiselect('Team stats', list(weekly_totals.columns.drop('Opponent')),
+                                default=['LA Clams Points', 'Opponent Points'], key='form_team_stats')
+    calculate_team_form(rolling_totals(weekly_totals, window), team_stats)
+
+    form_player = st.selectbox('Player', options=sorted_player_names, key='form_player')
+    player_stats = st.multiselect('Player stats', PLAYER_TOTAL_COLUMNS[1:], default=['Rushing Yards', 'Receiving Yards'],
+                                  key='form_player_stats')
+    calculate_player_form(load_player_form(season, version, window), form_player, player_stats)
+
+# Lineup analytics section
+@st.fragment
+def lineup_section(season, version):
+    st.subheader("Lineup Analytics")
+
+    # Rank players, pairs or whole seven-player units over the plays they were on the field together
+    group = st.radio('Rank', list(GROUPS), horizontal=True, key='lineup_group')
+    lineups = load_lineup_analytics(season, version, GROUPS[group])
+    if lineups.empty:
+        st.info("No lineups have been recorded for this season yet.")
+        return
+    min_plays = 1
+    if lineups['Plays'].max() > 1:
+        min_plays = st.slider('Minimum plays together', 1, int(lineups['Plays'].max()), 1, key='lineup_min_plays')
+    st.dataframe(lineups[lineups['Plays'] >= min_plays], hide_index=True)
+
+def main():
+    # Page configuration
+    st.set_page_config(page_title="LA Clams Stats", page_icon="🏈")
+    hide_menu_style = """
+    <style>
+    #MainMenu {visibility: hidden;}
+    footer {visibility: hidden;}
+    </style>
+    """
+    st.markdown(hide_menu_style, unsafe_allow_html=True)
+
+    # Display the header and logo
+    display_header()
+
+    # Season selection dropdown, shown once there is more than one season
+    seasons = list_seasons()
+    season = seasons[-1]
+    if len(seasons) > 1:
+        season = st.selectbox('Select a Season', seasons, index=len(seasons) - 1)
+
+    # Display the season title
+    st.subheader(f"🍁 {season} Season 🍁")
+
+    # During a game, follow the score and the current week's table as plays are entered
+    if st.toggle('Live game mode', key='live_mode'):
+        live_scoreboard(season)
+    else:
+        st.session_state.pop('live', None)
+
+    # Season and weekly tables come from the per-week totals alone
+    version = get_data_version(season)
+    weekly_totals = load_weekly_totals(season, version)
+    if weekly_totals.empty:
+        st.info("No stats have been recorded for this season yet.")
+        return
+
+    # Season averages, built once per data version
+    st.subheader('Season Averages')
+    display_data_as_table(cached_report('season', lambda: summarize_season(weekly_totals), season, version))
+
+    # Each section below is a fragment, so changing its selections reruns that section alone
+    game_statistics(season, version, weekly_totals)
+    drive_statistics(season, version, weekly_totals.index)
+
+    # Sort player names in alphabetical order
+    sorted_player_names = sorted(get_players())
+    player_statistics(season, version, sorted_player_names)
+    player_game_statistics(season, version, weekly_totals.index, sorted_player_names)
+    situational_splits(season, version, sorted_player_names)
+    yardage_distribution(season, version, weekly_totals.index, sorted_player_names)
+    recent_form(season, version, weekly_totals, sorted_player_names)
+    lineup_section(season, version)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Time the whole rerun, so the Diagnostics page can show what share the spans inside account for
+    with span('Home: rerun'):
+        main()
\ No newline at end of file
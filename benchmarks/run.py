@@ -0,0 +1,295 @@
+import argparse
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from src.aggregates import load_weekly_aggregates, update_weekly_aggregates
+from src.bulk_import import import_plays, read_game_sheet, validate_game_sheet
+from src.metrics import (calculate_average_stats, calculate_individual_player_stats, calculate_season_statistics,
+                         calculate_weekly_statistics, compute_player_totals)
+from src.drives import drive_table
+from src.history import record_change
+from src.sketches import build_yardage_sketches, sketch_error
+from src.splits import build_split_cubes, compare_split, split_totals
+from src.lineups import encode_lineups, lineup_analytics, lineup_roster, lineup_totals
+from src.schema import METRIC_COLUMNS
+from src.setup import build_position_index, get_players
+from src.storage import load_team_stats, open_season, open_store, snapshot_path
+from src.synthetic import generate_season, write_synthetic_store
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# A benchmark is reported as a regression when it is this many times slower than the baseline,
+# and by more than the noise floor (in seconds)
+TOLERANCE = 1.5
+NOISE_FLOOR = 0.05
+
+# Appends timed for the Admin write path
+WRITES = 20
+
+# Changes already in the history when the Admin submits are timed
+HISTORY_CHANGES = 3_000
+
+# Plays in the game sheet timed for Admin's import path
+GAME_SHEET_PLAYS = 100
+
+# Scorekeepers submitting at the same time, as the sessions (threads) of one Streamlit server
+SCOREKEEPERS = 4
+
+# Startup budget: a cold start of Home on a season of up to STARTUP_BUDGET_ROWS plays must take at most this many seconds
+# on the machine the baseline was saved on
+STARTUP_BUDGET = 3.0
+STARTUP_BUDGET_ROWS = 10_000
+
+# A fixed workload timed in every run, independent of this repo's code: the baseline's timings are scaled by how
+# much faster or slower it ran than when the baseline was saved, so the baseline holds on other machines too
+REFERENCE = 'reference: group and sum 1M rows'
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def digest(result):
+    """Short fingerprint of a benchmark's result, to catch refactors that change the numbers."""
+    if isinstance(result, pd.DataFrame):
+        result = result.to_csv()
+    return hashlib.sha1(json.dumps(result, default=str, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def measure(function, repeat):
+    """Best wall time over `repeat` runs, then peak traced memory of one more run, and the result."""
+    seconds = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        seconds = min(seconds, time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'seconds': seconds, 'peak_mb': peak / 2 ** 20, 'digest': digest(result)}
+
+
+def reference_step():
+    """The reference workload: a grouped sum over a million fixed random rows, the kind of work the metrics do."""
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({'key': rng.integers(0, 1000, size=1_000_000), 'value': rng.random(1_000_000)})
+    return round(float(data.groupby('key')['value'].sum().sum()), 6)
+
+
+def metric_benchmarks(data):
+    """The metric functions, each called the way Home calls it."""
+    week = int(data['Week'].iloc[0])
+    player = data.loc[data['Player Involved'] != 'No specific player', 'Player Involved'].iloc[0]
+    return {
+        'calculate_season_statistics': lambda: calculate_season_statistics(data)[1],
+        'calculate_weekly_statistics': lambda: calculate_weekly_statistics(data[data['Week'] == week], week),
+        'calculate_average_stats': lambda: calculate_average_stats(data, player),
+        'calculate_individual_player_stats': lambda: calculate_individual_player_stats(data, week, player),
+        'compute_player_totals (by week)': lambda: compute_player_totals(data, build_position_index(data), by_week=True),
+        'lineup analytics (encode and rank pairs)': lambda: lineup_pairs(data),
+        'drive table': lambda: drive_table(data),
+        'situational split cubes (build and query)': lambda: situational_split(data, player),
+        'yardage sketches (build, merge and check)': lambda: yardage_sketch_error(data),
+    }
+
+
+def situational_split(data, player):
+    """Total every stat per situation, then answer a player's 3rd/4th-and-short split, as Home does on a new load."""
+    team_cube, player_cube = build_split_cubes(data)
+    return compare_split(split_totals(player_cube, downs=[3, 4], distance=(0, 3), player=player),
+                         split_totals(player_cube, player=player))
+
+
+def lineup_pairs(data):
+    """Encode the lineups and rank every pair, as Home does on a new load."""
+    position_index = build_position_index(data)
+    roster = lineup_roster(position_index, get_players())
+    return lineup_analytics(lineup_totals(data, encode_lineups(data, position_index, roster)), roster, size=2)
+
+
+def yardage_sketch_error(data):
+    """Build every per-week yardage sketch, then compare the week and season views with the exact stats; 0.0 unless
+    the sketches lost something.
+    """
+    position_index = build_position_index(data)
+    masks = encode_lineups(data, position_index, lineup_roster(position_index, get_players()))
+    return sketch_error(data, build_yardage_sketches(data, masks))
+
+
+def storage_benchmarks(directory, data, seasons):
+    """Cold loads from each backend, one season from a partitioned store, and Admin's append path."""
+    benchmarks = {}
+    for extension in ['csv', 'parquet', 'sqlite']:
+        store = open_store(os.path.join(directory, f'plays.{extension}'))
+        store.write(data)
+        benchmarks[f'load ({extension})'] = lambda store=store: load_team_stats(store, columns=METRIC_COLUMNS)[0]['Yards'].sum()
+
+    seasons_directory = os.path.join(directory, 'seasons')
+    write_synthetic_store(seasons_directory, len(data), seasons=seasons)
+    season = open_season(location=seasons_directory)
+    benchmarks[f'load one of {seasons} seasons (partitioned)'] = lambda: load_team_stats(season, columns=METRIC_COLUMNS)[0]['Yards'].sum()
+
+    for extension in ['csv', 'sqlite']:
+        store = open_store(os.path.join(directory, f'plays.{extension}'))
+        record = data.iloc[-1].to_dict()
+        # A season's worth of earlier changes in the history, so a submit that grew with it would show
+        for _ in range(HISTORY_CHANGES):
+            record_change(store, [(None, record)])
+
+        def write_path(store=store, record=record):
+            # Submit WRITES plays the way Admin does: number and append each play, update the weekly totals
+            # and record it in the history
+            load_weekly_aggregates(store)
+            for _ in range(WRITES):
+                with store.lock():
+                    previous_version = store.version()
+                    added = {**record, 'Play': store.add_play(record)}
+                    update_weekly_aggregates(store, previous_version, added=pd.DataFrame([added]))
+                    record_change(store, [(None, added)])
+            return WRITES
+        benchmarks[f'{WRITES} Admin submits ({extension})'] = write_path
+
+    for name, location in [('csv', 'plays.csv'), ('sqlite', 'plays.sqlite'), ('partitioned', 'seasons')]:
+        store = open_season(location=os.path.join(directory, location))
+        record = data.iloc[-1].to_dict()
+
+        def concurrent_path(store=store, record=record):
+            # SCOREKEEPERS sessions submit WRITES plays between them; the store numbers them
+            def scorekeeper():
+                for _ in range(WRITES // SCOREKEEPERS):
+                    with store.lock():
+                        previous_version = store.version()
+                        added = {**record, 'Play': store.add_play(record)}
+                        update_weekly_aggregates(store, previous_version, added=pd.DataFrame([added]))
+            threads = [threading.Thread(target=scorekeeper) for _ in range(SCOREKEEPERS)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            # No two plays of the week may share a number
+            return not store.read(columns=['Play'], weeks=[record['Week']])['Play'].duplicated().any()
+        benchmarks[f'{WRITES} submits by {SCOREKEEPERS} scorekeepers ({name})'] = concurrent_path
+
+    # Checking a whole season as one sheet, and importing a game's worth of plays the way Admin does
+    sheet = game_sheet(directory, data)
+    benchmarks['validate game sheet'] = lambda: validate_game_sheet(sheet, get_players())[1]
+    game, errors = validate_game_sheet(sheet.head(GAME_SHEET_PLAYS), get_players())
+    for extension in ['csv', 'sqlite']:
+        store = open_store(os.path.join(directory, f'plays.{extension}'))
+        benchmarks[f'import {GAME_SHEET_PLAYS}-play game sheet ({extension})'] = lambda store=store: len(import_plays(store, game))
+    return benchmarks
+
+
+def game_sheet(directory, data):
+    """The plays written out as an uploaded CSV game sheet and read back, as Admin reads it."""
+    path = os.path.join(directory, 'game_sheet.csv')
+    data.drop(columns=['Play']).to_csv(path, index=False)
+    return read_game_sheet(path)
+
+
+def startup_benchmarks(directory, data):
+    """Home rendered once by a new Python process, as on a server's first session, without and with the CSV snapshot."""
+    path = os.path.join(directory, 'startup.csv')
+    open_store(path).write(data)
+    environment = {**os.environ, 'STATS_STORE': path}
+
+    def cold_start(snapshot):
+        if not snapshot and os.path.exists(snapshot_path(path)):
+            os.remove(snapshot_path(path))
+        # Outside `streamlit run` the page runs in bare mode: every import, load and metric runs, but nothing is served
+        return subprocess.run([sys.executable, 'Home.py'], cwd=ROOT, env=environment, capture_output=True).returncode
+    return {
+        'cold start Home (csv)': lambda: cold_start(snapshot=False),
+        'cold start Home (csv snapshot)': lambda: cold_start(snapshot=True),
+    }
+
+
+def run(sizes, seasons, repeat):
+    results = {REFERENCE: {'all': measure(reference_step, repeat)}}
+    print(f"{REFERENCE:45} {results[REFERENCE]['all']['seconds'] * 1000:27.1f} ms", flush=True)
+    for size in sizes:
+        data = generate_season(size, weeks=10, seed=size)
+        with tempfile.TemporaryDirectory() as directory:
+            benchmarks = {**metric_benchmarks(data), **storage_benchmarks(directory, data, seasons),
+                          **startup_benchmarks(directory, data)}
+            for name, function in benchmarks.items():
+                results.setdefault(name, {})[str(size)] = measure(function, repeat)
+                print(f"{name:45} {size:>10,} rows  {results[name][str(size)]['seconds'] * 1000:10.1f} ms"
+                      f"  {results[name][str(size)]['peak_mb']:8.1f} MB peak", flush=True)
+    return results
+
+
+def compare(results, baseline):
+    """Print the runs that got slower than TOLERANCE times the baseline or changed their result.
+
+    The baseline's timings are first scaled by the reference step's time in this run over its time in the baseline,
+    so a slower or faster machine does not count as a regression.
+    """
+    problems = []
+    speed = 1.0
+    if REFERENCE in baseline and REFERENCE in results:
+        speed = results[REFERENCE]['all']['seconds'] / baseline[REFERENCE]['all']['seconds']
+        print(f"This machine ran the reference step {speed:.2f} times as long as the baseline's; its timings are scaled by that")
+    for name, runs in results.items():
+        if name == REFERENCE:
+            continue
+        for size, result in runs.items():
+            expected = baseline.get(name, {}).get(size)
+            if expected is None:
+                continue
+            expected_seconds = expected['seconds'] * speed
+            slower = result['seconds'] - expected_seconds
+            if result['seconds'] > expected_seconds * TOLERANCE and slower > NOISE_FLOOR:
+                problems.append(f"{name} at {size} rows: {result['seconds'] * 1000:.1f} ms, "
+                                f"baseline {expected_seconds * 1000:.1f} ms on this machine")
+            if result['digest'] != expected['digest']:
+                problems.append(f"{name} at {size} rows: result changed ({result['digest']} != {expected['digest']})")
+    # The startup budget holds on the baseline's machine, and is scaled the same way
+    budget = STARTUP_BUDGET * speed
+    for size, result in results.get('cold start Home (csv snapshot)', {}).items():
+        if int(size) <= STARTUP_BUDGET_ROWS and result['seconds'] > budget:
+            problems.append(f"cold start Home at {size} rows: {result['seconds']:.2f} s, budget {budget:.1f} s on this machine")
+    for problem in problems:
+        print("REGRESSION:", problem)
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the metrics, load and write paths on synthetic play logs.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000],
+                        help="Numbers of plays to benchmark, e.g. 1000 10000 100000 1000000 10000000")
+    parser.add_argument('--seasons', type=int, default=8, help="Seasons in the partitioned store benchmark")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per benchmark; the best time is kept")
+    parser.add_argument('--save-baseline', action='store_true', help=f"Store the results in {BASELINE_PATH}")
+    parser.add_argument('--check', action='store_true', help="Exit with an error if any benchmark regressed")
+    args = parser.parse_args()
+
+    # The metric functions draw their tables with Streamlit, which only logs warnings outside `streamlit run`
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stderr(devnull):
+        results = run(args.sizes, args.seasons, args.repeat)
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, 'w') as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+        print(f"Saved baseline to {BASELINE_PATH}")
+    elif os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as file:
+            problems = compare(results, json.load(file))
+        if args.check and problems:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,66 +1,82 @@
 import streamlit as st
 import pandas as pd
-import streamlit_authenticator as stauth #add abilty to authenticate
-import os
-import yaml
+from src.auth import login
+from src.bulk_import import NUMBER_RANGES, calculate_points, import_plays, read_game_sheet, validate_game_sheet
+from src.history import describe_change, last_added_play, last_change, record_change, redo, undo
+from src.profiling import span
+from src.schema import largest_value
 from src.setup import get_players
+from src.storage import PartitionedStore, WriteConflict, diff_plays, list_seasons, open_season, open_store
+from src.aggregates import load_weekly_aggregates, update_weekly_aggregates
 
-def calculate_points(action, conversion_type=None, conversion_outcome=None):
-    points = 0
-    if action in ['Touchdown', 'Pick-Six']:  # Correctly check if the action is one of these types
-        points = 6  # standard points for a touchdown or pick-six
-
-    # Check if there was an attempted conversion and whether it was successful
-    if action == 'Conversion' and conversion_outcome == 'Complete':
-        if conversion_type == '1-point':
-            points = 1  # points for a successful 1-point conversion
-        elif conversion_type == '2-point':
-            points = 2  # points for a successful 2-point conversion
-
-    return points
-
-# get credentials for dashboard
-with open('credentials.yaml') as file:
-    config = yaml.safe_load(file)
-
-authenticator = stauth.Authenticate(
-    config['credentials'],
-    config['cookie']['name'],
-    config['cookie']['key'],
-    config['cookie']['expiry_days'],
-    config['preauthorized']
-)
-
-name, authentication_status, username = authenticator.login('Login', 'main')
+# Season choice for starting a season that has no plays yet
+NEW_SEASON = 'New season...'
 
 # only if log-in was successful, continue
-if authentication_status:
+user = login()
+if user:
 
     st.header("LA Clams Statistics Entry Page")
 
-    # Check if the stats CSV exists, if not, create an empty one
-    if not os.path.exists('team_stats.csv'):
-        columns = [
-            'Week', 'Opponent', 'Half', 'Down', 'Yards to Go',
-            'Play', 'Offense/Defense', 'Players on Field', 'Player Positions', 'Action', 
-            'Player Involved', 'Touchdown Type', 'Pass Outcome', 'Yards', 'Points', 'Notes'
-        ]
-        pd.DataFrame(columns=columns).to_csv('team_stats.csv', index=False)
+    # Pick the season when the configured store holds several (team_stats.csv holds just one)
+    seasons = list_seasons()
+    season = seasons[-1]
+    if isinstance(open_store(), PartitionedStore):
+        season = st.selectbox('Season:', [*seasons, NEW_SEASON], index=len(seasons) - 1, key='admin_season')
+        if season == NEW_SEASON:
+            # A new season directory is only created once its name is typed and confirmed, so a typo cannot start one
+            season = st.text_input('New season name:', key='new_season_name').strip()
+            if season in seasons:
+                st.info(f"{season} already exists; select it above.")
+                st.stop()
+            if not season or not st.checkbox(f"Start a new season named '{season}'", key=f'confirm_season_{season}'):
+                st.stop()
+    store = open_season(season)
+
+    # Import a whole game from a CSV or Excel sheet: every play is checked in one pass and, when the
+    # sheet is clean, recorded in one write and undone as one change
+    with st.expander('Import plays from a game sheet'):
+        if 'import_message' in st.session_state:
+            st.success(st.session_state.pop('import_message'))
+        st.caption("One play per row, with the columns of team_stats.csv. Play numbers are assigned on import; "
+                   "Players on Field and Points may be left out and are filled in from the lineup and the action.")
+        # A new uploader after each import, so the same sheet is not imported twice
+        import_round = st.session_state.setdefault('import_round', 0)
+        sheet_file = st.file_uploader('Game sheet:', type=['csv', 'xlsx'], key=f"game_sheet_{import_round}")
+        if sheet_file is not None:
+            try:
+                sheet = read_game_sheet(sheet_file)
+            except ImportError:
+                st.error('Reading Excel sheets needs the openpyxl package; save the sheet as CSV instead.')
+            else:
+                plays, errors = validate_game_sheet(sheet, get_players())
+                if not errors.empty:
+                    st.error(f"Found {len(errors)} problems in {errors['Row'].nunique()} rows, so nothing was imported. "
+                             "Fix them in the sheet and upload it again.")
+                    st.dataframe(errors, hide_index=True)
+                elif plays.empty:
+                    st.info('The sheet has no plays.')
+                else:
+                    weeks = ', '.join(map(str, sorted(plays['Week'].unique())))
+                    st.write(f"{len(plays)} plays for week {weeks} are ready to import.")
+                    if st.button(f"Import {len(plays)} plays", key="import_plays_button"):
+                        with span('Admin: import plays', rows=len(plays)):
+                            added = import_plays(store, plays, user)
+                        st.session_state.import_message = f"Imported {len(added)} plays for week {weeks}."
+                        st.session_state.import_round += 1
+                        st.rerun()
 
     # Initialize or update session state variables
-    if 'play_count' not in st.session_state:
-        st.session_state.play_count = 0
     if 'week' not in st.session_state:
         st.session_state.week = 1
     if 'opponent' not in st.session_state:
         st.session_state.opponent = ""
 
     # Set Week number
-    new_week = st.number_input('Week:', min_value=1, value=st.session_state.week)
+    new_week = st.number_input('Week:', min_value=1, max_value=largest_value('Week'), value=st.session_state.week)
     if new_week != st.session_state.week:
         # When moving to a new week, reset all weekly information
         st.session_state.week = new_week
-        st.session_state.play_count = 0
         st.session_state.opponent = ""
 
     # Information about the game
@@ -72,8 +88,9 @@ if authentication_status:
     conversion_type = None
     conversion_outcome = None
 
-    # Display the play count
-    st.write(f"Inputting data for Play: {st.session_state.play_count + 1}")
+    # Display the play number; the store assigns it for real when the play is saved,
+    # so it moves on if another scorekeeper saves a play of this week first
+    st.write(f"Inputting data for Play: {store.next_play(st.session_state.week)}")
 
     # Selecting offense or defense
     offense_or_defense = st.selectbox('Offense or defense?', ['Offense', 'Defense'], key="offense_defense_select")
@@ -87,7 +104,7 @@ if authentication_status:
     # Play info
     half = st.selectbox('Half:', ['1st', '2nd'], key="half_select")
     down = st.number_input('Down (1-4):', min_value=1, max_value=4, value=1, key="down_input")
-    yards_to_go = st.number_input('Yards to Go:', min_value=0, value=10, key="yards_to_go_input")
+    yards_to_go = st.number_input('Yards to Go:', min_value=0, max_value=largest_value('Yards to Go'), value=10, key="yards_to_go_input")
 
     players = get_players()
 
@@ -129,12 +146,6 @@ if authentication_status:
 
     # Submit the play info
     if st.button('Submit Play Info', key="submit_play_info_button"):
-        # Increase the play count for each submission
-        st.session_state.play_count += 1
-
-        # Read the current CSV
-        df = pd.read_csv('team_stats.csv')
-
         # Calculate points based on the action
         points = calculate_points(action, conversion_type, conversion_outcome)
 
@@ -145,7 +156,7 @@ if authentication_status:
             'Half': half,
             'Down': down,
             'Yards to Go': yards_to_go,
-            'Play': st.session_state.play_count,
+            'Play': None,  # numbered by the store
             'Offense/Defense': offense_or_defense,
             'Players on Field': ', '.join(selected_players),
             'Player Positions': ', '.join(f"{player} as {position}" for player, position in player_positions.items()),
@@ -159,40 +170,104 @@ if authentication_status:
             'Notes': notes,
         }
 
-        df = pd.concat([df, pd.DataFrame([new_data])], ignore_index=True)
-
-        # Save the updated CSV
-        df.to_csv('team_stats.csv', index=False)
-        st.success('Play info saved successfully!')
+        # Append only the new play instead of rewriting the whole store, then add its totals to the
+        # per-week aggregates, all under the store's lock so concurrent scorekeepers take turns
+        with span('Admin: submit play', rows=1), store.lock():
+            previous_version = store.version()
+            new_data['Play'] = store.add_play(new_data)
+            update_weekly_aggregates(store, previous_version, added=pd.DataFrame([new_data]))
+            record_change(store, [(None, new_data)], user)
+        st.success(f"Play {new_data['Play']} saved successfully!")
 
     # Option to delete a play if a mistake was made
     if st.button('Delete Last Play'):
-        if st.session_state.play_count > 0:
-            df = pd.read_csv('team_stats.csv')
-            # Make sure we're deleting the right play (the most recent for the current week)
-            recent_play = df[(df['Week'] == st.session_state.week) & (df['Play'] == st.session_state.play_count)]
-            if not recent_play.empty:
-                # Correctly update the play_count before deleting the entry from the DataFrame
-                st.session_state.play_count -= 1
-                # Deleting the row with the most recent play
-                df = df.drop(recent_play.index)
-                # Save the updated CSV
-                df.to_csv('team_stats.csv', index=False)
+        # The last play this user entered for the current week that is still recorded, found in the
+        # saved history, so it is still the right play after a reload or from another device
+        last_play = last_added_play(store, st.session_state.week, user)
+        if last_play is not None:
+            with span('Admin: delete play', rows=1), store.lock():
+                # Look the play up by its key and delete only that play instead of rewriting the whole store
+                recent_play = store.get_play(st.session_state.week, last_play)
+                if recent_play is not None:
+                    previous_version = store.version()
+                    store.delete(st.session_state.week, last_play)
+                    update_weekly_aggregates(store, previous_version, removed=pd.DataFrame([recent_play]))
+                    record_change(store, [(recent_play, None)], user)
+            if recent_play is not None:
                 st.success('Last play deleted successfully.')
             else:
                 st.error('No play available to delete for the current week.')
         else:
             st.error('No plays have been inputted yet for deletion.')
 
-    # Display the current data
+    # Undo and redo go through the history saved next to the store, so they reach back over
+    # every scorekeeper's changes, across sessions and reloads
+    if 'history_message' in st.session_state:
+        st.success(st.session_state.pop('history_message'))
+    undo_change, redo_change = last_change(store, 'undo'), last_change(store, 'redo')
+    undo_column, redo_column = st.columns(2)
+    undo_clicked = undo_column.button(f"Undo {describe_change(undo_change)}" if undo_change else 'Undo',
+                                      disabled=undo_change is None, key="undo_button")
+    redo_clicked = redo_column.button(f"Redo {describe_change(redo_change)}" if redo_change else 'Redo',
+                                      disabled=redo_change is None, key="redo_button")
+    if undo_clicked or redo_clicked:
+        try:
+            with span('Admin: undo' if undo_clicked else 'Admin: redo'):
+                change = undo(store) if undo_clicked else redo(store)
+        except WriteConflict:
+            st.error('The plays this would change were changed again since, so nothing was undone or redone.')
+        else:
+            if change is not None:
+                st.session_state.history_message = f"{'Undid' if undo_clicked else 'Redid'} {describe_change(change)}."
+            # Rerun so the buttons and the table show the plays as they are now
+            st.rerun()
+
+    # Display the current data, one week (and optionally a range of its plays) at a time
     st.subheader('Current Team Stats')
-    current_df = pd.read_csv('team_stats.csv')  # This df is loaded after any possible deletion operation above
-    st.data_editor(current_df)
+    weeks = sorted({int(week) for week in load_weekly_aggregates(store).index} | {st.session_state.week})
+    edit_week = st.selectbox('Week to edit:', weeks, index=weeks.index(st.session_state.week), key="edit_week_select")
+    with span('Admin: read plays') as read_span:
+        week_df = store.read(weeks=[edit_week])
+        read_span['rows'] = len(week_df)
+    first_play, last_play = 1, 1
+    if not week_df.empty:
+        first_play, last_play = int(week_df['Play'].min()), int(week_df['Play'].max())
+    if first_play < last_play:
+        first_play, last_play = st.slider('Plays:', first_play, last_play, (first_play, last_play), key="edit_plays_slider")
+    window_df = week_df[week_df['Play'].between(first_play, last_play)]
+
+    # The table's edits are kept by row position, so while there are unsaved edits the editor stays on
+    # the plays it was opened on; Save then only checks that those rows were not changed by someone else
+    editor_key = f"editor_{edit_week}_{first_play}_{last_play}"
+    pending = (st.session_state.get(editor_key) or {}).get('edited_rows')
+    if not pending or st.session_state.get('editor_window_key') != editor_key:
+        st.session_state.editor_window = window_df
+        st.session_state.editor_window_key = editor_key
+    current_df = st.session_state.editor_window
+    # The (Week, Play) key identifies the play on disk, so it cannot be edited here
+    # Numbers stay within the ranges the form allows, which the columns' types hold without wrapping
+    edited_df = st.data_editor(current_df, key=editor_key, disabled=['Week', 'Play'], column_config={
+        column: st.column_config.NumberColumn(min_value=low, max_value=high, step=1)
+        for column, (low, high) in NUMBER_RANGES.items() if column != 'Week'
+    })
 
     if st.button('Save', key="save"):
-        current_df.to_csv('team_stats.csv', index=False)
-        st.success('Updated data saved successfully!')
+        # Only the edited rows are written, in place, and change the per-week aggregates
+        removed, added = diff_plays(current_df, edited_df)
+        try:
+            with span('Admin: save edits', rows=len(added)), store.lock():
+                previous_version = store.version()
+                store.update_plays(added, expected=removed)
+                update_weekly_aggregates(store, previous_version, added=added, removed=removed)
+                record_change(store, zip(removed.to_dict('records'), added.to_dict('records')), user)
+        except WriteConflict:
+            st.error('Some of the plays you edited were changed by someone else in the meantime, so your edits were not saved. '
+                     'Discard them to edit the latest plays.')
+        else:
+            # The edits are saved, so the next run opens the editor on the saved plays
+            del st.session_state[editor_key]
+            st.success(f'Updated {len(added)} play(s) successfully!')
 
-# don't let someone in without the password
-elif authentication_status is False:
-    st.error('Username/password is incorrect')
\ No newline at end of file
+    if pending and st.button('Discard Edits'):
+        del st.session_state[editor_key]
+        st.rerun()
@@ -0,0 +1,39 @@
+import streamlit as st
+from src import profiling, report_cache
+from src.auth import login
+
+# only signed-in scorekeepers can see the timings
+if login():
+
+    st.header("Diagnostics")
+
+    # Recording is shared by every session of this server, so switching it on times other people's reruns too
+    recording = st.toggle('Record timings', value=profiling.enabled)
+    if recording != profiling.enabled:
+        profiling.enable(recording)
+        st.rerun()
+
+    # Timings of every load, metric and table render, and of Admin's reads and writes
+    timings = profiling.summary()
+    if timings.empty:
+        st.info("No timings recorded yet. Switch recording on, then use the Home and Admin pages.")
+    else:
+        st.dataframe(timings, hide_index=True, column_config={
+            column: st.column_config.NumberColumn(format="%.1f") for column in ['Total (ms)', 'Mean (ms)', 'Max (ms)']
+        })
+
+    # Export every recorded span, for chrome://tracing or ui.perfetto.dev
+    col1, col2 = st.columns(2)
+    col1.download_button('Download profile', profiling.export_trace(), file_name='stats-profile.json', mime='application/json')
+    if col2.button('Reset timings'):
+        profiling.reset()
+        st.rerun()
+
+    # Home's season, week and player tables, reused until the plays change
+    st.subheader("Report cache")
+    cache_stats = report_cache.stats()
+    for column, (label, value) in zip(st.columns(len(cache_stats)), cache_stats.items()):
+        column.metric(label, f"{value:.1f}" if isinstance(value, float) else value)
+    if st.button('Clear report cache'):
+        report_cache.reset()
+        st.rerun()
@@ -0,0 +1,136 @@
+import json
+import os
+
+import pandas as pd
+
+from src.metrics import compute_weekly_totals
+from src.profiling import profiled
+from src.schema import METRIC_COLUMNS, apply_schema
+from src.storage import SeasonStore
+
+
+def aggregates_path(store):
+    """Path of the materialized per-week totals kept next to the store."""
+    return store.path + '.weekly.json'
+
+
+def _normalize_version(version):
+    # Versions are compared after a JSON round trip, which turns tuples into lists
+    return json.loads(json.dumps(version))
+
+
+def _read_aggregates(store):
+    """Return (version, weekly totals) from disk, or (None, None) when there is nothing saved."""
+    if not os.path.exists(aggregates_path(store)):
+        return None, None
+    with open(aggregates_path(store), encoding='utf-8') as file:
+        saved = json.load(file)
+    weekly_totals = pd.DataFrame(saved['weeks'], columns=saved['columns']).set_index('Week')
+    numeric = weekly_totals.columns.drop('Opponent')
+    weekly_totals[numeric] = weekly_totals[numeric].astype('int64')
+    return saved['version'], weekly_totals
+
+
+def _write_aggregates(store, weekly_totals):
+    """Save the weekly totals, stamped with the store version they describe."""
+    saved = {
+        'version': _normalize_version(store.version()),
+        'columns': ['Week', *weekly_totals.columns],
+        'weeks': weekly_totals.reset_index().astype(object).values.tolist(),
+    }
+    temporary_path = aggregates_path(store) + '.tmp'
+    with open(temporary_path, 'w', encoding='utf-8') as file:
+        json.dump(saved, file, default=lambda value: value.item())
+    os.replace(temporary_path, aggregates_path(store))
+
+
+def read_weekly_aggregates(store):
+    """Return (version, weekly totals) as last saved by the writers, without taking the lock or rebuilding anything.
+
+    The version is the store version the totals describe, in the form of store.version() after a JSON round trip;
+    (None, None) when some of them were never saved.
+    """
+    if isinstance(store, SeasonStore):
+        # Each week's partition keeps its own summary, stamped with that partition's version
+        weeks = store.weeks()
+        saved = [_read_aggregates(store.partition(week)) for week in weeks]
+        if any(weekly_totals is None for _, weekly_totals in saved):
+            return None, None
+        if not saved:
+            return [], compute_weekly_totals(apply_schema(pd.DataFrame(columns=METRIC_COLUMNS)))
+        version = [[week, partition_version] for week, (partition_version, _) in zip(weeks, saved)]
+        return version, pd.concat([weekly_totals for _, weekly_totals in saved])
+    return _read_aggregates(store)
+
+
+@profiled
+def rebuild_weekly_aggregates(store):
+    """Recompute the weekly totals from every play in the store and save them."""
+    # Under the store's lock, so no play is written between reading the plays and stamping their version
+    with store.lock():
+        weekly_totals = compute_weekly_totals(apply_schema(store.read(columns=METRIC_COLUMNS)))
+        _write_aggregates(store, weekly_totals)
+    return weekly_totals
+
+
+@profiled
+def load_weekly_aggregates(store):
+    """Return the per-week totals, rebuilding them only if they do not match the store's current data."""
+    if isinstance(store, SeasonStore):
+        # Each week's partition keeps its own summary, so only stale partitions are re-read
+        partitions = [load_weekly_aggregates(partition) for partition in store.partitions()]
+        if not partitions:
+            return compute_weekly_totals(apply_schema(pd.DataFrame(columns=METRIC_COLUMNS)))
+        return pd.concat(partitions)
+
+    version, weekly_totals = _read_aggregates(store)
+    if weekly_totals is None or version != _normalize_version(store.version()):
+        return rebuild_weekly_aggregates(store)
+    return weekly_totals
+
+
+def apply_play_deltas(weekly_totals, plays, sign=1):
+    """Add (sign=1) or subtract (sign=-1) the totals of some plays to the per-week totals."""
+    if plays is None or plays.empty:
+        return weekly_totals
+    deltas = compute_weekly_totals(apply_schema(plays[METRIC_COLUMNS]))
+    numeric = deltas.columns.drop('Opponent')
+
+    weekly_totals = weekly_totals.copy()
+    existing = deltas.index.intersection(weekly_totals.index)
+    weekly_totals.loc[existing, numeric] += sign * deltas.loc[existing, numeric]
+    # A play in a week without totals yet starts that week, and takes its opponent from it
+    new_weeks = deltas.index.difference(weekly_totals.index, sort=False)
+    if sign > 0 and len(new_weeks):
+        weekly_totals = pd.concat([weekly_totals, deltas.loc[new_weeks]])
+    # Weeks whose last play was removed disappear, as they would from a full recompute
+    return weekly_totals[weekly_totals['Plays'] > 0]
+
+
+@profiled
+def update_weekly_aggregates(store, previous_version, added=None, removed=None):
+    """Bring the saved weekly totals up to date after a write, by applying the changed plays' deltas.
+
+    `previous_version` is the store version from before the write; if the saved totals were not
+    describing that version, another writer got in between and they are rebuilt instead. Callers
+    hold store.lock() around reading the version, writing and this update.
+    """
+    if isinstance(store, SeasonStore):
+        # Route each changed play to its week's partition and update that partition's summary
+        previous_versions = {week: version for week, version in _normalize_version(previous_version)}
+        changed = [plays for plays in (added, removed) if plays is not None and not plays.empty]
+        for week in sorted({int(week) for plays in changed for week in plays['Week']}):
+            update_weekly_aggregates(store.partition(week), previous_versions.get(week),
+                                     added=None if added is None else added[added['Week'] == week],
+                                     removed=None if removed is None else removed[removed['Week'] == week])
+        return load_weekly_aggregates(store)
+
+    with store.lock():
+        version, weekly_totals = _read_aggregates(store)
+        if weekly_totals is None or version != _normalize_version(previous_version):
+            return rebuild_weekly_aggregates(store)
+
+        weekly_totals = apply_play_deltas(weekly_totals, removed, sign=-1)
+        weekly_totals = apply_play_deltas(weekly_totals, added, sign=1)
+        _write_aggregates(store, weekly_totals)
+    return weekly_totals
@@ -0,0 +1,36 @@
+import os
+
+import streamlit as st
+import streamlit_authenticator as stauth #add abilty to authenticate
+import yaml
+
+
+@st.cache_data
+def load_auth_config(path='credentials.yaml', version=None):
+    """Parse the credentials file once per server; `version` (its mtime) reloads it when the file changes.
+
+    Every call returns its own copy, so the authenticator can never change the cached config.
+    """
+    with open(path) as file:
+        return yaml.safe_load(file)
+
+
+def login():
+    """Show the login form on a page and return the signed-in username, or None until the user signs in."""
+    # get credentials for dashboard
+    config = load_auth_config('credentials.yaml', os.stat('credentials.yaml').st_mtime_ns)
+
+    authenticator = stauth.Authenticate(
+        config['credentials'],
+        config['cookie']['name'],
+        config['cookie']['key'],
+        config['cookie']['expiry_days'],
+        config['preauthorized']
+    )
+
+    name, authentication_status, username = authenticator.login('Login', 'main')
+
+    # don't let someone in without the password
+    if authentication_status is False:
+        st.error('Username/password is incorrect')
+    return username if authentication_status else None
@@ -0,0 +1,194 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.aggregates import update_weekly_aggregates
+from src.history import record_change
+from src.metrics import DEFENSIVE_POSITIONS, OFFENSIVE_POSITIONS
+from src.profiling import profiled
+from src.schema import CATEGORIES, COLUMNS, largest_value
+from src.setup import build_position_index
+
+# A game sheet has one play per row, in the columns of team_stats.csv. 'Play' is left out (the store
+# numbers the plays), 'Players on Field' is taken from 'Player Positions' when it is missing, and
+# 'Points' is worked out from the action when it is left blank.
+REQUIRED_COLUMNS = ['Week', 'Opponent', 'Half', 'Down', 'Yards to Go', 'Offense/Defense', 'Player Positions', 'Action', 'Yards']
+
+PLAYERS_ON_FIELD = 7
+
+# Positions each side can line up in
+SIDE_POSITIONS = {'Offense': OFFENSIVE_POSITIONS, 'Defense': DEFENSIVE_POSITIONS}
+
+# Numeric columns and the range the Admin form allows for each, never past what the column's type holds
+NUMBER_RANGES = {
+    'Week': (1, largest_value('Week')),
+    'Down': (1, 4),
+    'Yards to Go': (0, largest_value('Yards to Go')),
+    'Yards': (-100, 100),
+    'Points': (0, largest_value('Points')),
+}
+
+# What the Admin form records in 'Player Involved' when nobody in particular was
+NO_PLAYER = 'No specific player'
+
+
+def calculate_points(action, conversion_type=None, conversion_outcome=None):
+    points = 0
+    if action in ['Touchdown', 'Pick-Six']:  # Correctly check if the action is one of these types
+        points = 6  # standard points for a touchdown or pick-six
+
+    # Check if there was an attempted conversion and whether it was successful
+    if action == 'Conversion' and conversion_outcome == 'Complete':
+        if conversion_type == '1-point':
+            points = 1  # points for a successful 1-point conversion
+        elif conversion_type == '2-point':
+            points = 2  # points for a successful 2-point conversion
+
+    return points
+
+
+def read_game_sheet(file, name=None):
+    """Read an uploaded CSV or Excel game sheet as text, with blank cells as missing.
+
+    Excel sheets need openpyxl; pandas raises ImportError when it is not installed.
+    """
+    extension = os.path.splitext(name or getattr(file, 'name', ''))[1].lower()
+    if extension in ('.xlsx', '.xls'):
+        sheet = pd.read_excel(file, dtype=str)
+    else:
+        sheet = pd.read_csv(file, dtype=str, keep_default_na=False)
+    sheet.columns = sheet.columns.str.strip()
+    sheet = sheet.apply(lambda column: column.str.strip())
+    return sheet.replace('', None).reset_index(drop=True)
+
+
+def _possible_points():
+    # Every score calculate_points can give for an action and conversion outcome, over both conversion types
+    rows = [(action, outcome or '', calculate_points(action, conversion_type, outcome))
+            for action in CATEGORIES['Action']
+            for outcome in [*CATEGORIES['Conversion Outcome'], None]
+            for conversion_type in ['1-point', '2-point']]
+    return pd.DataFrame(rows, columns=['Action', 'Conversion Outcome', 'Points']).drop_duplicates()
+
+
+def _errors(rows, column, messages):
+    # One error per sheet row where the boolean Series `rows` is True, or per row label in an array of them,
+    # numbered as in the spreadsheet: the header is row 1, so the first play is row 2
+    if isinstance(rows, pd.Series) and rows.dtype == bool:
+        if isinstance(messages, pd.Series):
+            messages = messages[rows]
+        rows = rows.index[rows]
+    if isinstance(messages, pd.Series):
+        messages = messages.to_numpy()
+    return pd.DataFrame({'Row': np.asarray(rows, dtype='int64') + 2, 'Column': column, 'Error': messages})
+
+
+@profiled
+def validate_game_sheet(sheet, roster):
+    """Check every play of a game sheet in one pass and return (plays, errors).
+
+    `plays` holds the plays ready to record, in the store's columns with 'Play' left for the store to
+    number; `errors` has one row (Row, Column, Error) per problem found, and is empty when the sheet
+    can be imported as it is.
+    """
+    missing = [column for column in REQUIRED_COLUMNS if column not in sheet]
+    if missing:
+        return pd.DataFrame(columns=COLUMNS), pd.DataFrame({'Row': 1, 'Column': missing, 'Error': 'Missing column'})
+
+    # Plain objects throughout, so blanks are None and messages can be built from any column
+    sheet = sheet.reindex(columns=[*COLUMNS, *sheet.columns.difference(COLUMNS)]).astype(object)
+    sheet = sheet.where(sheet.notna(), None)
+    blank = sheet.isna()
+    found = [_errors(blank['Opponent'], 'Opponent', 'Opponent is missing')]
+
+    # Numbers, within the ranges the Admin form allows ('Points' may be left blank)
+    numbers = {}
+    for column, (low, high) in NUMBER_RANGES.items():
+        values = pd.to_numeric(sheet[column], errors='coerce')
+        required = column != 'Points'
+        bad = values.isna() & (~blank[column] | required)
+        bad |= values.notna() & (values != values.round())
+        bad |= values.notna() & ~values.between(low, high)
+        found.append(_errors(bad, column, f"{column} must be a whole number between {low} and {high}"))
+        numbers[column] = values.where(~bad)
+
+    # Known values in the categorical columns
+    for column, known in CATEGORIES.items():
+        if known:
+            bad = ~blank[column] & ~sheet[column].isin(known)
+            found.append(_errors(bad, column, "Unknown value '" + sheet[column].astype(str) + f"', expected one of {', '.join(known)}"))
+    for column in ['Half', 'Offense/Defense', 'Action']:
+        found.append(_errors(blank[column], column, f"{column} is missing"))
+    involved = ~blank['Player Involved'] & ~sheet['Player Involved'].isin([*roster, NO_PLAYER])
+    found.append(_errors(involved, 'Player Involved', "Unknown player '" + sheet['Player Involved'].astype(str) + "'"))
+
+    # Lineups: seven different roster players, each in a position of their side
+    entries = build_position_index(sheet)
+    entries['Player'] = entries['Player'].astype(object)
+    entries['Position'] = entries['Position'].astype(object)
+    unreadable = entries['Player'].isna()
+    found.append(_errors(entries.loc[unreadable, 'Row'], 'Player Positions', "Entries must read 'Name as Position'"))
+    entries = entries[~unreadable]
+    counts = entries.groupby('Row').size().reindex(sheet.index, fill_value=0)
+    found.append(_errors(counts != PLAYERS_ON_FIELD, 'Player Positions',
+                         f"Exactly {PLAYERS_ON_FIELD} players must be on the field, found " + counts.astype(str)))
+    repeated = entries[entries.duplicated(['Row', 'Player'])]
+    found.append(_errors(repeated['Row'], 'Player Positions', repeated['Player'] + ' is listed more than once'))
+    unknown = entries[~entries['Player'].isin(roster)]
+    found.append(_errors(unknown['Row'], 'Player Positions', "Unknown player '" + unknown['Player'] + "'"))
+    sides = pd.Series(sheet['Offense/Defense'].to_numpy()[entries['Row'].to_numpy()], index=entries.index, dtype=object)
+    allowed = pd.MultiIndex.from_tuples([(side, position) for side, positions in SIDE_POSITIONS.items() for position in positions])
+    misplaced = entries[sides.isin(list(SIDE_POSITIONS)) & ~pd.MultiIndex.from_arrays([sides, entries['Position']]).isin(allowed)]
+    found.append(_errors(misplaced['Row'], 'Player Positions',
+                         misplaced['Player'] + ' cannot play ' + misplaced['Position'] + ' on ' + sides[misplaced.index].str.lower()))
+
+    # 'Players on Field', when given, must name the same players as the lineup
+    listed = sheet['Players on Field'].str.split(',').explode().str.strip().dropna()
+    listed_pairs = pd.MultiIndex.from_arrays([listed.index, listed])
+    lineup_pairs = pd.MultiIndex.from_arrays([entries['Row'], entries['Player']])
+    differ = listed.index[~listed_pairs.isin(lineup_pairs)].union(entries['Row'][~lineup_pairs.isin(listed_pairs)])
+    found.append(_errors(~blank['Players on Field'] & sheet.index.isin(differ), 'Players on Field',
+                         'Players on Field does not match the players in Player Positions'))
+
+    # Points must be a score calculate_points could give; when left blank they are filled in if only one score fits
+    possible = _possible_points()
+    known_action = sheet['Action'].isin(CATEGORIES['Action'])
+    outcomes = sheet['Conversion Outcome'].fillna('')
+    scored = pd.MultiIndex.from_arrays([sheet['Action'], outcomes, numbers['Points']])
+    fits = pd.Series(scored.isin(pd.MultiIndex.from_frame(possible)), index=sheet.index)
+    found.append(_errors(known_action & numbers['Points'].notna() & ~fits, 'Points', 'Points do not match the action'))
+    choices = possible.groupby(['Action', 'Conversion Outcome'])['Points'].agg(['first', 'size'])
+    choice = choices.reindex(pd.MultiIndex.from_arrays([sheet['Action'], outcomes])).set_axis(sheet.index)
+    found.append(_errors(blank['Points'] & (choice['size'] > 1), 'Points', 'Points are needed for a completed conversion (1 or 2)'))
+    points = numbers['Points'].fillna(choice['first'].where(choice['size'] == 1))
+
+    errors = pd.concat(found, ignore_index=True).sort_values('Row', kind='stable', ignore_index=True)
+
+    plays = sheet[COLUMNS].copy()
+    for column in ['Week', 'Down', 'Yards to Go', 'Yards']:
+        plays[column] = numbers[column]
+    plays['Points'] = points
+    plays['Play'] = None
+    # Otherwise the names in Player Positions, in its order, as the Admin form writes them
+    plays['Players on Field'] = plays['Players on Field'].fillna(sheet['Player Positions'].str.replace(r'\s+as\s+[^,]*', '', regex=True))
+    if errors.empty:
+        plays = plays.astype({column: 'int64' for column in ['Week', 'Down', 'Yards to Go', 'Yards', 'Points']})
+    return plays, errors
+
+
+@profiled
+def import_plays(store, plays, user=None):
+    """Record validated plays in one write, update the weekly totals and add the batch to the history as one change.
+
+    Returns the plays with the numbers the store gave them.
+    """
+    records = plays.to_dict('records')
+    with store.lock():
+        previous_version = store.version()
+        numbers = store.add_plays(records)
+        records = [{**record, 'Play': play} for record, play in zip(records, numbers)]
+        added = pd.DataFrame(records, columns=COLUMNS)
+        update_weekly_aggregates(store, previous_version, added=added)
+        record_change(store, [(None, record) for record in records], user)
+    return added
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+from src.profiling import profiled
+from src.stats import DRIVE_STATS, evaluate_stats
+
+# Columns the drives are rebuilt from
+DRIVE_COLUMNS = ['Week', 'Half', 'Down', 'Play', 'Offense/Defense', 'Action', 'Yards', 'Points']
+
+# Plays that end a drive with a score, after which the other team gets the ball
+SCORES = ['Touchdown', 'Pick-Six']
+
+# How a drive ended, from the last play of it that was not a conversion attempt
+RESULTS = {'Touchdown': 'Touchdown', 'Pick-Six': 'Pick-Six', 'Interception': 'Interception', 'Forced Fumble': 'Fumble'}
+TURNOVERS = ['Interception', 'Pick-Six', 'Fumble']
+
+
+def _play_order(data):
+    # Plays in the order they were played: by week, then play number
+    return data.sort_values(['Week', 'Play'], kind='stable')
+
+
+def _snaps(plays):
+    """Whether each play, in play order, starts a drive.
+
+    A snap is any play but a conversion attempt; the attempt after a score belongs to the scoring drive.
+    """
+    week = plays['Week'].to_numpy()
+    # Compared as integer codes, which categorical columns already hold
+    half = pd.factorize(plays['Half'])[0]
+    side = pd.factorize(plays['Offense/Defense'])[0]
+    snap = (plays['Action'] != 'Conversion').to_numpy()
+    score = plays['Action'].isin(SCORES).to_numpy()
+
+    if plays.empty:
+        return np.zeros(0, dtype=bool)
+    positions = np.arange(len(plays))
+    # The last snap up to each play, then the one before each play
+    last_snap = np.maximum.accumulate(np.where(snap, positions, -1))
+    previous = np.r_[-1, last_snap[:-1]]
+    earlier = np.maximum(previous, 0)
+    # A drive starts with each week and half, and with the first snap after the ball changed sides or a score
+    # in the same half
+    new_period = np.r_[True, (week[1:] != week[:-1]) | (half[1:] != half[:-1])]
+    period_start = np.maximum.accumulate(np.where(new_period, positions, 0))
+    changed = (previous >= period_start) & ((side != side[earlier]) | score[earlier])
+    return new_period | (snap & changed)
+
+
+@profiled
+def drive_table(data):
+    """One row per drive, in play order: when it was, who had the ball, its plays, yards, result, points
+    and 3rd/4th-down conversions. Needs the DRIVE_COLUMNS of the plays.
+    """
+    if data.empty:
+        return pd.DataFrame(columns=['Week', 'Drive', 'Half', 'Possession', 'Result', *[name for name, _, _ in DRIVE_STATS]])
+    plays = _play_order(data)
+    starts = _snaps(plays)
+    drive = np.cumsum(starts) - 1
+    snap = (plays['Action'] != 'Conversion').to_numpy()
+    down = plays['Down'].to_numpy()
+
+    # A 3rd or 4th down is converted when it scores, or the drive's next snap is a 1st down
+    positions = np.arange(len(plays))
+    snaps = positions[snap]
+    # The snap after each play is the first snap at a later position
+    after = np.searchsorted(snaps, positions, side='right')
+    has_next = after < len(snaps)
+    following = snaps[np.minimum(after, len(snaps) - 1)] if len(snaps) else positions
+    first_down = has_next & (drive[following] == drive) & (down[following] == 1)
+    plays = plays.assign(Converted=plays['Action'].isin(SCORES).to_numpy() | first_down)
+
+    totals = evaluate_stats(plays, DRIVE_STATS, by=pd.Series(drive, index=plays.index, name='Drive'))
+
+    # Who had the ball and when, from each drive's first play; how it ended, from its last snap
+    first = positions[starts]
+    last = pd.Series(np.where(snap, positions, -1)).groupby(drive).max().to_numpy()
+    last = np.where(last >= 0, last, first)
+    week = plays['Week'].to_numpy()[first]
+    half = plays['Half'].iloc[first].to_numpy(dtype=object)
+    ended = plays['Action'].iloc[last].to_numpy(dtype=object)
+    # Drives not ended by a score or a turnover ran out of downs, or out of time at the end of the half
+    period_end = np.r_[(week[1:] != week[:-1]) | (half[1:] != half[:-1]), True]
+    result = pd.Series(ended).map(RESULTS).fillna(pd.Series(np.where(period_end, 'End of half', 'Downs')))
+
+    drives = pd.DataFrame({
+        'Week': week,
+        'Drive': pd.Series(week).groupby(week).cumcount().to_numpy() + 1,
+        'Half': half,
+        'Possession': np.where(plays['Offense/Defense'].iloc[first].to_numpy(dtype=object) == 'Offense', 'LA Clams', 'Opponent'),
+        'Result': result.to_numpy(dtype=object),
+    })
+    return pd.concat([drives, totals.reset_index(drop=True).astype('int64')], axis=1)
+
+
+def summarize_drives(drives):
+    """Per-drive averages of each team, over the drives of a week or a season."""
+    summary = {}
+    for team in ['LA Clams', 'Opponent']:
+        own = drives[drives['Possession'] == team]
+        count = len(own)
+        points = own['LA Clams Points' if team == 'LA Clams' else 'Opponent Points']
+        attempts = own['3rd/4th Down Attempts'].sum()
+        summary.update({
+            f'{team} Drives': count,
+            f'{team} Average Plays per Drive': own['Plays'].mean() if count else 'N/A',
+            f'{team} Average Yards per Drive': own['Yards'].mean() if count else 'N/A',
+            f'{team} Points per Drive': points.sum() / count if count else 'N/A',
+            f'{team} Touchdown Drives (%)': 100 * (own['Result'] == 'Touchdown').mean() if count else 'N/A',
+            f'{team} Turnovers': int(own['Result'].isin(TURNOVERS).sum()),
+            f'{team} 3rd/4th Down Conversion Rate (%)':
+                100 * own['3rd/4th Down Conversions'].sum() / attempts if attempts else 'N/A',
+        })
+    return summary
@@ -0,0 +1,217 @@
+import json
+import os
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from src.aggregates import update_weekly_aggregates
+from src.live import publish
+from src.schema import COLUMNS
+from src.storage import WriteConflict, _python_value
+
+# Every change to the plays is kept as a list of (before, after) pairs of play records: an added
+# play has no `before`, a deleted play no `after`. Undo applies the pairs backwards, redo forwards.
+#
+# The history is an append-only log, one JSON line per entry: a recorded change, an undo or a redo.
+# Only the latest MAX_DEPTH changes can be undone (or redone), and once the log holds COMPACT_AFTER entries
+# it is rewritten as a snapshot of those, so it stays bounded and a submit only appends a line.
+
+# Changes kept for undo, and undone changes kept for redo
+MAX_DEPTH = 100
+
+# Log entries after which the log is rewritten as one snapshot entry
+COMPACT_AFTER = 200
+
+# The history each process last read, per log, with the file identity it was read at
+_cache = {}
+
+
+def history_path(store):
+    """Path of the undo/redo history log kept next to the store."""
+    return store.path + '.history.jsonl'
+
+
+def _step(history, entry):
+    # Apply one log entry to the undo and redo stacks
+    if entry['op'] == 'snapshot':
+        history['undo'], history['redo'] = entry['undo'], entry['redo']
+    elif entry['op'] == 'record':
+        history['undo'].append(entry['change'])
+        history['redo'] = []
+        del history['undo'][:-MAX_DEPTH]
+    elif entry['op'] == 'undo':
+        history['redo'].append(history['undo'].pop())
+    elif entry['op'] == 'redo':
+        history['undo'].append(history['redo'].pop())
+    history['entries'] += 1
+
+
+def _identity(path):
+    # Appends change the size, and compaction replaces the file
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def _read_history(store):
+    """The undo and redo stacks, replayed from the log only when someone else changed it since this process last did.
+
+    The result is shared, so callers must not change it.
+    """
+    path = history_path(store)
+    try:
+        identity = _identity(path)
+    except FileNotFoundError:
+        return {'undo': [], 'redo': [], 'entries': 0}
+    cached = _cache.get(path)
+    if cached is None or cached[0] != identity:
+        history = {'undo': [], 'redo': [], 'entries': 0}
+        with open(path, encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    _step(history, json.loads(line))
+        cached = _cache[path] = (identity, history)
+    return cached[1]
+
+
+def _append(store, entry):
+    """Add an entry to the log, or rewrite the log as a snapshot once it is long; call it under store.lock()."""
+    history = _read_history(store)
+    history = {'undo': list(history['undo']), 'redo': list(history['redo']), 'entries': history['entries']}
+    _step(history, entry)
+    path = history_path(store)
+    if history['entries'] < COMPACT_AFTER:
+        with open(path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(entry) + '\n')
+    else:
+        # Keep only what can still be undone or redone
+        snapshot = {'op': 'snapshot', 'undo': history['undo'][-MAX_DEPTH:], 'redo': history['redo'][-MAX_DEPTH:]}
+        with open(path + '.tmp', 'w', encoding='utf-8') as file:
+            file.write(json.dumps(snapshot) + '\n')
+        os.replace(path + '.tmp', path)
+        history = {'undo': snapshot['undo'], 'redo': snapshot['redo'], 'entries': 1}
+    # This process wrote the log last, so it knows the stacks without reading it back
+    _cache[path] = (_identity(path), history)
+
+
+def _record(play):
+    # A plain JSON-friendly copy of a play, with every column and missing values as None
+    if play is None:
+        return None
+    return {column: _python_value(play.get(column)) for column in COLUMNS}
+
+
+def record_change(store, changes, user=None):
+    """Add a change, as a list of (before, after) play records, to the history, clear the redo stack and publish it live.
+
+    Appends one line to the history log, so its cost does not grow with the history.
+    """
+    changes = list(changes)
+    if not changes:
+        return
+    change = {
+        'user': user,
+        'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'plays': [{'before': _record(before), 'after': _record(after)} for before, after in changes],
+    }
+    with store.lock():
+        _append(store, {'op': 'record', 'change': change})
+        publish(store, [(pair['before'], pair['after']) for pair in change['plays']])
+
+
+def describe_change(change):
+    """A short description of a change, e.g. 'add play 12 of week 3'."""
+    plays = change['plays']
+    if len(plays) > 1:
+        weeks = ', '.join(map(str, sorted({(pair['before'] or pair['after'])['Week'] for pair in plays})))
+        # An import adds a whole sheet of plays at once
+        if all(pair['before'] is None for pair in plays):
+            return f"import of {len(plays)} plays in week {weeks}"
+        return f"edit of {len(plays)} plays in week {weeks}"
+    before, after = plays[0]['before'], plays[0]['after']
+    verb = 'add' if before is None else 'delete' if after is None else 'edit'
+    play = before or after
+    return f"{verb} play {play['Play']} of week {play['Week']}"
+
+
+def last_change(store, stack='undo'):
+    """The change the next undo (or redo, with stack='redo') would apply, or None."""
+    history = _read_history(store)
+    return history[stack][-1] if history[stack] else None
+
+
+def _missing(value):
+    # CSV reads an empty cell back as missing, so an empty string counts as missing too
+    return value is None or value == '' or (not isinstance(value, str) and pd.isna(value))
+
+
+def _matches(current, expected):
+    """Whether the play as stored now is the play as the history recorded it."""
+    return all(current.get(column) == value or (_missing(current.get(column)) and _missing(value))
+               for column, value in expected.items())
+
+
+def _apply(store, pairs):
+    """Turn each pair's `before` into its `after`, checking first that every play is still at `before`."""
+    for before, after in pairs:
+        play = before or after
+        current = store.get_play(play['Week'], play['Play'])
+        if before is None and current is not None:
+            raise WriteConflict(f"Play {play['Play']} of week {play['Week']} has been recorded again since")
+        if before is not None and (current is None or not _matches(current, before)):
+            raise WriteConflict(f"Play {play['Play']} of week {play['Week']} was changed since")
+
+    for before, after in pairs:
+        if before is None:
+            store.append(after)
+        elif after is None:
+            store.delete(before['Week'], before['Play'])
+        else:
+            store.update(after)
+    removed = pd.DataFrame([before for before, after in pairs if before is not None], columns=COLUMNS)
+    added = pd.DataFrame([after for before, after in pairs if after is not None], columns=COLUMNS)
+    return removed, added
+
+
+def _move(store, source, target, backwards):
+    with store.lock():
+        history = _read_history(store)
+        if not history[source]:
+            return None
+        change = history[source][-1]
+        pairs = [(pair['after'], pair['before']) if backwards else (pair['before'], pair['after']) for pair in change['plays']]
+        previous_version = store.version()
+        removed, added = _apply(store, pairs)
+        update_weekly_aggregates(store, previous_version, added=added, removed=removed)
+        _append(store, {'op': source})
+        publish(store, pairs)
+    return change
+
+
+def undo(store):
+    """Revert the most recent change to the plays, by anyone, and return it (None when there is nothing to undo).
+
+    Raises WriteConflict, leaving the plays and the history as they were, if the plays it touched have
+    been changed by a write that is not in the history.
+    """
+    return _move(store, 'undo', 'redo', backwards=True)
+
+
+def redo(store):
+    """Re-apply the most recently undone change and return it (None when there is nothing to redo)."""
+    return _move(store, 'redo', 'undo', backwards=False)
+
+
+def last_added_play(store, week, user=None):
+    """The number of the most recent play `user` added to `week` that is still recorded, or None.
+
+    Only the changes that can still be undone are looked through.
+    """
+    added = [pair['after']['Play'] for change in reversed(_read_history(store)['undo']) if change['user'] == user
+             for pair in reversed(change['plays']) if pair['before'] is None and pair['after']['Week'] == week]
+    if not added:
+        return None
+    # Usually the latest one is still there; otherwise the week's play numbers are read once, not looked up one by one
+    if store.get_play(week, added[0]) is not None:
+        return added[0]
+    recorded = set(store.read(columns=['Play'], weeks=[week])['Play'].dropna().astype(int))
+    return next((play for play in added[1:] if int(play) in recorded), None)
@@ -0,0 +1,114 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from src.profiling import profiled
+from src.sketches import yardage_stats
+from src.stats import LINEUP_STATS, evaluate_stats, percent
+
+# A lineup is stored as one bit per roster player, so a 64-bit integer holds any lineup of a roster of up to 64
+MAX_ROSTER = 64
+
+# What lineup_analytics can rank, by the number of players in a group; None means the whole unit on the field
+GROUPS = {'Players': 1, 'Pairs': 2, 'Units': None}
+
+
+def lineup_roster(position_index, players):
+    """The players the bits stand for: `players` first, in order, then anyone else named in the lineups."""
+    extra = sorted(set(position_index['Player'].dropna().unique()) - set(players))
+    roster = [*players, *extra]
+    if len(roster) > MAX_ROSTER:
+        raise ValueError(f"Lineups can be encoded for at most {MAX_ROSTER} players, found {len(roster)}")
+    return roster
+
+
+def _bits(roster):
+    return np.left_shift(np.uint64(1), np.arange(len(roster), dtype=np.uint64))
+
+
+def player_bits(roster, players):
+    """The bitmask with the bit of each of `players` set."""
+    return np.uint64(sum(1 << roster.index(player) for player in players))
+
+
+@profiled
+def encode_lineups(data, position_index, roster):
+    """One uint64 per play of `data`, with bit i set when roster[i] was on the field (0 for plays without a lineup)."""
+    # Look up each distinct name once rather than every entry
+    codes, names = pd.factorize(position_index['Player'])
+    players = np.append(pd.Index(roster).get_indexer(names), -1)[codes]
+    plays = data.index.get_indexer(position_index['Row'])
+    # Entries whose player could not be parsed set no bit
+    known = players >= 0
+    plays, bits = plays[known], _bits(roster)[players[known]]
+    # OR together the bits of each play's run of entries
+    order = np.argsort(plays, kind='stable')
+    plays, bits = plays[order], bits[order]
+    masks = np.zeros(len(data), dtype=np.uint64)
+    if len(plays):
+        starts = np.flatnonzero(np.r_[True, plays[1:] != plays[:-1]])
+        masks[plays[starts]] = np.bitwise_or.reduceat(bits, starts)
+    return masks
+
+
+def on_field(masks, roster, *players):
+    """Boolean array of the plays on which all of `players` were on the field together."""
+    bits = player_bits(roster, players)
+    return (masks & bits) == bits
+
+
+@profiled
+def lineup_totals(data, masks):
+    """LINEUP_STATS totals of every distinct lineup, indexed by its bitmask, in one grouped pass."""
+    totals = evaluate_stats(data, LINEUP_STATS, by=pd.Series(masks, index=data.index, name='Lineup'))
+    # Plays without a lineup count for nobody; small sums may come back as int8, which the differences would overflow
+    return totals.drop(np.uint64(0), errors='ignore').astype('int64')
+
+
+def _rates(totals):
+    # The stats shown for every player, pair and unit, from the totals of the plays they were on together
+    return pd.DataFrame({
+        'Plays': totals['Plays'],
+        'Point Differential': totals['Points For'] - totals['Points Against'],
+        'Success Rate (%)': percent(totals['Successful Plays'], totals['Plays']).round(1),
+        'Yards per Play': totals['Offensive Yards'] / totals['Offensive Plays'].where(totals['Offensive Plays'] > 0),
+        'Yards Allowed per Play': totals['Yards Allowed'] / totals['Defensive Plays'].where(totals['Defensive Plays'] > 0),
+    }, index=totals.index)
+
+
+@profiled
+def lineup_analytics(totals, roster, size=None, sketches=None):
+    """Rank every player (size 1), pair (size 2) or whole unit (None) by point differential over the plays they shared.
+
+    `totals` comes from lineup_totals; groups that never shared the field are left out. Given the season's yardage
+    `sketches` of every lineup (from src/sketches.py), the median and explosive-play rate of their offensive plays
+    are added, from the sketches of the lineups each group was part of merged together.
+    """
+    if sketches is not None:
+        sketches = sketches.reindex(totals.index, fill_value=0)
+    if size is None:
+        names = [', '.join(player for player, bit in zip(roster, _bits(roster)) if mask & bit) for mask in totals.index]
+        ranked = _rates(totals)
+        group_sketches = sketches
+    else:
+        # Which roster players each distinct lineup had on the field, and every group of `size` of them
+        membership = (totals.index.to_numpy(dtype=np.uint64)[:, None] & _bits(roster)) != 0
+        groups = np.array(list(itertools.combinations(range(len(roster)), size)), dtype=int).reshape(-1, size)
+        # A group shared a lineup's plays when all its players were in it, so its totals are a product of the
+        # (lineups x groups) membership with the (lineups x stats) totals
+        together = membership[:, groups].all(axis=2)
+        group_totals = pd.DataFrame(together.T.astype(np.int64) @ totals.to_numpy(dtype=np.int64), columns=totals.columns)
+        shared = group_totals['Plays'].to_numpy() > 0
+        names = [' & '.join(roster[player] for player in group) for group in groups[shared]]
+        ranked = _rates(group_totals[shared])
+        if sketches is not None:
+            # Merging sketches is adding them, so the same product merges every group's lineups at once
+            group_sketches = pd.DataFrame(together.T[shared].astype(np.int64) @ sketches.to_numpy(dtype=np.int64),
+                                          index=ranked.index, columns=sketches.columns)
+    if sketches is not None:
+        yardage = yardage_stats(group_sketches)
+        ranked['Median Yards per Play'] = yardage['Median Yards'].to_numpy()
+        ranked['Explosive Plays (%)'] = yardage['Explosive Plays (%)'].to_numpy()
+    ranked.insert(0, 'Players', names)
+    return ranked.sort_values(['Point Differential', 'Plays'], ascending=False, ignore_index=True)
@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+from src.aggregates import _normalize_version, apply_play_deltas, read_weekly_aggregates
+from src.metrics import compute_weekly_totals
+from src.schema import COLUMNS, METRIC_COLUMNS, apply_schema
+from src.storage import _json_default
+
+# Every change to the plays is published as one line of <store>.events.jsonl: the plays it removed,
+# the plays it added and the store version it left. Viewers apply the events to the totals they loaded
+# instead of reloading, and never take the store's lock, so they cannot hold up the scorekeepers.
+
+# How often, in seconds, live viewers look for new events
+REFRESH_SECONDS = 1
+
+# Events kept in memory; a viewer that falls further behind reloads instead
+MAX_EVENTS = 5_000
+
+# Size in bytes past which the feed file is started over, so it stays bounded; viewers then reload their totals
+MAX_FEED_BYTES = 1_000_000
+
+
+def events_path(store):
+    """Path of the live event feed kept next to the store."""
+    return store.path + '.events.jsonl'
+
+
+def publish(store, pairs):
+    """Publish a change, as (before, after) play records, to live viewers; call it under store.lock(), after the write."""
+    event = {
+        'removed': [before for before, after in pairs if before is not None],
+        'added': [after for before, after in pairs if after is not None],
+        'version': _normalize_version(store.version()),
+    }
+    with open(events_path(store), 'a', encoding='utf-8') as feed:
+        feed.write(json.dumps(event, default=_json_default) + '\n')
+        size = feed.tell()
+    if size > MAX_FEED_BYTES:
+        # Replaced by a new, empty file, which readers tell apart from the old one by its inode
+        temporary_path = events_path(store) + '.tmp'
+        open(temporary_path, 'w').close()
+        os.replace(temporary_path, events_path(store))
+
+
+class EventFeed:
+    """The events of one store, read from its feed by a single reader shared by every session of the server.
+
+    However many viewers poll, the file is checked at most once per REFRESH_SECONDS and only its new
+    lines are read. Positions count the events since the feed was created, so a viewer can ask for
+    everything after the last event it applied. When the file is started over, events written before
+    that may not have been read, so every earlier position counts as too far behind.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._events = []
+        # Events dropped from memory, and bytes of the file already read
+        self._dropped = 0
+        self._offset = 0
+        self._inode = None
+        self._checked = None
+
+    def _refresh(self, force=False):
+        now = time.monotonic()
+        if not force and self._checked is not None and now - self._checked < REFRESH_SECONDS:
+            return
+        self._checked = now
+        try:
+            stat = os.stat(self.path)
+            size, inode = stat.st_size, stat.st_ino
+        except FileNotFoundError:
+            size, inode = 0, None
+        if inode != self._inode or size < self._offset:
+            # The feed was started over (or is read for the first time): read the new file from its beginning,
+            # and make the viewers of the old one reload, as they may have missed its last events
+            if self._inode is not None:
+                self._dropped += len(self._events) + 1
+            self._events, self._offset, self._inode = [], 0, inode
+        if size == self._offset:
+            return
+        with open(self.path, 'rb') as feed:
+            feed.seek(self._offset)
+            data = feed.read(size - self._offset)
+        # Leave a line that is still being written for the next check
+        complete = data[:data.rfind(b'\n') + 1]
+        self._offset += len(complete)
+        self._events.extend(json.loads(line) for line in complete.splitlines() if line)
+        if len(self._events) > MAX_EVENTS:
+            self._dropped += len(self._events) - MAX_EVENTS
+            del self._events[:-MAX_EVENTS]
+
+    def position(self, force=False):
+        """The position after the last event published so far (with force=True, checking the file right now)."""
+        with self._lock:
+            self._refresh(force)
+            return self._dropped + len(self._events)
+
+    def after(self, version):
+        """The position right after the last kept event that left the store at `version`, or None (checking the file right now)."""
+        with self._lock:
+            self._refresh(force=True)
+            for index in range(len(self._events) - 1, -1, -1):
+                if self._events[index].get('version') == version:
+                    return self._dropped + index + 1
+            return None
+
+    def since(self, position):
+        """(events after `position`, new position), or (None, position) if those events are no longer kept."""
+        with self._lock:
+            self._refresh()
+            if position < self._dropped:
+                return None, position
+            return self._events[position - self._dropped:], self._dropped + len(self._events)
+
+
+def _read_plays_totals(store):
+    # Weekly totals computed from the plays, without saving them, and the version they were read at
+    while True:
+        version = _normalize_version(store.version())
+        weekly_totals = compute_weekly_totals(apply_schema(store.read(columns=METRIC_COLUMNS)))
+        if _normalize_version(store.version()) == version:
+            return version, weekly_totals
+
+
+def live_baseline(store, feed):
+    """(feed position, weekly totals, their version), so applying the events after that position, except one
+    stamped with that version, brings the totals up to date.
+
+    Reads the totals the writers saved, without the store's lock, and finds the event that left the store at
+    their version, so the events after it are the ones they are missing. Only when the feed no longer has it,
+    or nothing was saved, are the totals computed from the plays; rebuilding the saved ones is left to the writers.
+    """
+    version, weekly_totals = read_weekly_aggregates(store)
+    while True:
+        if weekly_totals is not None:
+            position = feed.after(version)
+            if position is not None:
+                return position, weekly_totals, version
+            # Either a writer is about to publish the event of this version, which is then skipped, or nothing
+            # changed since the feed began; the store still being at this version after reading the feed tells
+            position = feed.position(force=True)
+            if version == _normalize_version(store.version()):
+                return position, weekly_totals, version
+        version, weekly_totals = _read_plays_totals(store)
+
+
+def apply_events(weekly_totals, events, version=None):
+    """The weekly totals with the events' added plays added and their removed plays subtracted.
+
+    An event stamped with `version`, the version the totals were read at, is already counted in them and skipped.
+    """
+    events = [event for event in events if version is None or event.get('version') != version]
+    # Totals are sums, so a batch of events applies in two passes; adding first keeps a week whose
+    # plays were all replaced from dropping out in between
+    added = [play for event in events for play in event['added']]
+    removed = [play for event in events for play in event['removed']]
+    weekly_totals = apply_play_deltas(weekly_totals, pd.DataFrame(added, columns=COLUMNS), sign=1)
+    return apply_play_deltas(weekly_totals, pd.DataFrame(removed, columns=COLUMNS), sign=-1)
@@ -1,373 +1,292 @@
+import numpy as np
 import pandas as pd
-from collections import Counter
 from src.setup import *
+from src.profiling import profiled
+from src.stats import (PLAYER_ACTION_STATS, PLAYER_FIELD_STATS, QUARTERBACK_STATS, SEASON_REPORT, TEAM_STATS, WEEK_REPORT,
+                       evaluate_stats, percent, team_stat)
 
 
-def calculate_season_statistics(data):
-    # First, ensure we only include weeks with data
-    weeks_with_data = data['Week'].unique()
-
-    # Initialize variables to store total stats
-    total_clams_points = 0
-    total_opponent_points = 0
-    total_plays = 0
-    total_offensive_plays = 0
-    total_defensive_plays = 0
-    total_passing_tds = 0
-    total_rushing_tds = 0
-    total_interceptions_offense = 0
-    total_interceptions_defense = 0
-    total_rushing_yards = 0
-    total_receiving_yards = 0
-    total_tds = 0
-    total_flags_pulled = 0
-    successful_conversions = 0
-    attempted_conversions = 0
-    total_penalties = 0
-    total_successful_offense = 0
-    total_successful_defense = 0
-    total_pct_successful_offense = 0
-    total_pct_successful_defense = 0
-    total_pct_time_offense = 0
-
-    # Calculate statistics for each week and accumulate totals
-    for week in weeks_with_data:
-        week_data = data[data['Week'] == week]
-
-        # Calculate statistics
-        clams_points_scored = week_data[(week_data['Offense/Defense'] == 'Offense') & (week_data['Action'] != 'Pick-Six')]['Points'].sum()
-        opponent_points_scored = week_data[(week_data['Offense/Defense'] == 'Defense') | ((week_data['Offense/Defense'] == 'Offense') & (week_data['Action'] == 'Pick-Six'))]['Points'].sum()
-        plays = len(week_data)
-        offensive_plays = len(week_data[week_data['Offense/Defense'] == 'Offense'])
-        defensive_plays = len(week_data[week_data['Offense/Defense'] == 'Defense'])
-        passing_tds = len(week_data[(week_data['Offense/Defense'] == 'Offense') & (week_data['Action'] == 'Touchdown') & (week_data['Touchdown Type'] == 'Passing Touchdown')])
-        rushing_tds = len(week_data[(week_data['Offense/Defense'] == 'Offense') & (week_data['Action'] == 'Touchdown') & (week_data['Touchdown Type'] == 'Rushing Touchdown')])
-        interceptions_offense = len(week_data[(week_data['Offense/Defense'] == 'Offense') & week_data['Action'].isin(['Interception', 'Pick-Six'])])
-        interceptions_defense = len(week_data[(week_data['Offense/Defense'] == 'Defense') & week_data['Action'].isin(['Interception', 'Pick-Six'])])
-        rushing_yards = week_data[(week_data['Offense/Defense'] == 'Offense') & (week_data['Touchdown Type'] == 'Rushing Touchdown')]['Yards'].sum()
-        receiving_yards = week_data[(week_data['Offense/Defense'] == 'Offense') & (week_data['Touchdown Type'] == 'Passing Touchdown')]['Yards'].sum()
-        total_tds_game = passing_tds + rushing_tds
-        flags_pulled = len(week_data[week_data['Action'] == 'Flag Pull'])
-        conversions_made = len(week_data[(week_data['Offense/Defense'] == 'Offense') & (week_data['Conversion Outcome'] == 'Complete')])
-        conversions_attempted = len(week_data[(week_data['Offense/Defense'] == 'Offense') & (week_data['Action'] == 'Conversion')])
-        penalties = len(week_data[week_data['Action'] == 'Penalty'])
-        successful_offense = len(week_data[week_data['Offense/Defense'] == 'Offense'][week_data['Yards'] > 0])
-        successful_defense = len(week_data[week_data['Offense/Defense'] == 'Defense'][week_data['Yards'] <= 0])
-        pct_successful_offense = (successful_offense/offensive_plays) * 100 if offensive_plays > 0 else 0
-        pct_successful_defense = (successful_defense/defensive_plays) * 100 if defensive_plays > 0 else 0
-        percent_plays_offense = (offensive_plays / plays) * 100 if plays > 0 else 0
-
-
-        # Accumulate totals
-        total_clams_points += clams_points_scored
-        total_opponent_points += opponent_points_scored
-        total_plays += plays
-        total_offensive_plays += offensive_plays
-        total_defensive_plays += defensive_plays
-        total_passing_tds += passing_tds
-        total_rushing_tds += rushing_tds
-        total_interceptions_offense += interceptions_offense
-        total_interceptions_defense += interceptions_defense
-        total_rushing_yards += rushing_yards
-        total_receiving_yards += receiving_yards
-        total_tds += total_tds_game
-        total_flags_pulled += flags_pulled
-        successful_conversions += conversions_made
-        attempted_conversions += conversions_attempted
-        total_penalties += penalties
-        total_successful_offense += successful_offense
-        total_successful_defense += successful_defense
-        total_pct_successful_offense += pct_successful_offense
-        total_pct_successful_defense += pct_successful_defense
-        total_pct_time_offense += percent_plays_offense
-
-    # Now, calculate the average statistics over the season
-    num_games= len(weeks_with_data)
-    avg_clams_points = round(total_clams_points / num_games, 1)
-    avg_opponent_points = round(total_opponent_points / num_games, 1)
-    avg_plays = round(total_plays / num_games, 1)
-    avg_offensive_plays = round(total_offensive_plays / num_games, 1)
-    avg_defensive_plays = round(total_defensive_plays / num_games, 1)
-    avg_total_successful_offense = round(total_successful_offense / num_games, 1)
-    avg_total_successful_defense = round(total_successful_defense / num_games, 1)
-    avg_pct_successful_offense = round(total_pct_successful_offense / num_games, 1)
-    avg_pct_successful_defense = round(total_pct_successful_defense / num_games, 1)
-    avg_passing_tds = round(total_passing_tds / num_games, 1)
-    avg_rushing_tds = round(total_rushing_tds / num_games, 1)
-    avg_interceptions_offense = round(total_interceptions_offense / num_games, 1)
-    avg_interceptions_defense = round(total_interceptions_defense / num_games, 1)
-    avg_rushing_yards = round(total_rushing_yards / num_games, 1)
-    avg_receiving_yards = round(total_receiving_yards / num_games, 1)
-    avg_total_tds = round(total_tds / num_games, 1)
-    avg_flags_pulled = round(total_flags_pulled / num_games, 1)
-    avg_successful_conversions = round(successful_conversions / num_games, 1)
-    avg_attempted_conversions = round(attempted_conversions / num_games, 1)
-    avg_conversion_rate = round((avg_successful_conversions / avg_attempted_conversions) * 100 if avg_attempted_conversions > 0 else 0, 1)
-    avg_penalties = round(total_penalties / num_games, 1)
-    avg_time_offense = round(total_pct_time_offense / num_games, 1)
-
-    # Create a summary dictionary for the season averages
-    season_averages_summary = {
-        'Games Played (w/stats)': num_games,
-        'Average LA Clams Points per Game': f"{avg_clams_points:.1f}",
-        'Average Opponent Points per Game': f"{avg_opponent_points:.1f}",
-        'Average Total Plays per Game': f"{avg_plays:.1f}",
-        'Average Offensive Plays per Game': f"{avg_offensive_plays:.1f}",
-        'Average Defensive Plays per Game': f"{avg_defensive_plays:.1f}",
-        'Average % Time on Offense': f"{avg_time_offense:.1f}",
-        'Average Successful Offensive Plays per Game': f"{avg_total_successful_offense:.1f}",
-        'Average Successful Defensive Plays per Game': f"{avg_total_successful_defense:.1f}",
-        '% Successful Offensive Plays per Game': f"{avg_pct_successful_offense:.1f}",
-        '% Successful Defensive Plays per Game': f"{avg_pct_successful_defense:.1f}",
-        'Average Passing TDs per Game': f"{avg_passing_tds:.1f}",
-        'Average Rushing TDs per Game': f"{avg_rushing_tds:.1f}",
-        'Average Total TDs per Game': f"{avg_total_tds:.1f}",
-        'Average Interceptions (while on Offense) per Game': f"{avg_interceptions_offense:.1f}",
-        'Average Interceptions (while on Defense) per Game': f"{avg_interceptions_defense:.1f}",
-        'Average Rushing Yards per Game': f"{avg_rushing_yards:.1f}",
-        'Average Receiving Yards per Game': f"{avg_receiving_yards:.1f}",
-        'Average Flags Pulled per Game': f"{avg_flags_pulled:.1f}",
-        'Average Successful Conversions per Game': f"{avg_successful_conversions:.1f}",
-        'Average Attempted Conversions per Game': f"{avg_attempted_conversions:.1f}",
-        'Average Conversion Rate (%)': f"{avg_conversion_rate:.1f}",
-        'Average Penalties per Game': f"{avg_penalties:.1f}",
-}
+@profiled
+def compute_weekly_totals(data):
+    """Compute every per-week total in TEAM_STATS in one grouped pass over the plays."""
+    weekly_totals = evaluate_stats(data, TEAM_STATS, by=data['Week'], sort=False)
 
-    # Display the season average summary
-    st.subheader('Season Averages')
-    display_data_as_table(season_averages_summary)
+    # The opponent is taken from the first play of each week
+    opponents = data.drop_duplicates('Week').set_index('Week')['Opponent']
+    weekly_totals.insert(0, 'Opponent', opponents.reindex(weekly_totals.index))
+    return weekly_totals
 
 
-def calculate_weekly_statistics(week_data, week_number):
-    # Calculate the various statistics
-    opponent = week_data['Opponent'].iloc[0]
-    clams_points_scored = week_data[(week_data['Offense/Defense'] == 'Offense') & (week_data['Action'] != 'Pick-Six')]['Points'].sum()
-    total_points_allowed = week_data[(week_data['Offense/Defense'] == 'Defense') | ((week_data['Offense/Defense'] == 'Offense') & (week_data['Action'] == 'Pick-Six'))]['Points'].sum()
-    outcome = "W" if clams_points_scored > total_points_allowed else "L"
-    num_plays = len(week_data)
-    num_offense_plays = len(week_data[week_data['Offense/Defense'] == 'Offense'])
-    num_defense_plays = len(week_data[week_data['Offense/Defense'] == 'Defense'])
-    percent_plays_offense = (num_offense_plays / num_plays) * 100 if num_plays > 0 else 0
-    percent_plays_defense = (num_defense_plays / num_plays) * 100 if num_plays > 0 else 0
-    successful_offense = len(week_data[week_data['Offense/Defense'] == 'Offense'][week_data['Yards'] > 0])
-    pct_successful_offense = (successful_offense/num_offense_plays) * 100 if num_offense_plays > 0 else 0
-    successful_defense = len(week_data[week_data['Offense/Defense'] == 'Defense'][week_data['Yards'] <= 0])
-    pct_successful_defense = (successful_defense/num_defense_plays) * 100 if num_defense_plays > 0 else 0
-    passing_tds = len(week_data[week_data['Offense/Defense'] == 'Offense'][week_data['Action'] == 'Touchdown'][week_data['Touchdown Type'] == 'Passing Touchdown'])
-    rushing_tds = len(week_data[week_data['Offense/Defense'] == 'Offense'][week_data['Action'] == 'Touchdown'][week_data['Touchdown Type'] == 'Rushing Touchdown'])
-    interceptions_offense = len(week_data[(week_data['Offense/Defense'] == 'Offense') & week_data['Action'].isin(['Interception', 'Pick-Six'])])
-    interceptions_defense = len(week_data[(week_data['Offense/Defense'] == 'Defense') & week_data['Action'].isin(['Interception', 'Pick-Six'])])
-    total_rushing_yards = week_data[week_data['Offense/Defense'] == 'Offense'][week_data['Touchdown Type'] == 'Rushing Touchdown']['Yards'].sum()
-    total_receiving_yards = week_data[week_data['Offense/Defense'] == 'Offense'][week_data['Touchdown Type'] == 'Passing Touchdown']['Yards'].sum()
-    total_tds = passing_tds + rushing_tds
-    total_flags_pulled = len(week_data[week_data['Action'] == 'Flag Pull'])
-    successful_conversions = len(week_data[week_data['Offense/Defense'] == 'Offense'][week_data['Conversion Outcome'] == 'Complete'])
-    attempted_conversions = len(week_data[week_data['Offense/Defense'] == 'Offense'][week_data['Action'] == 'Conversion'])
-    conversion_rate = (successful_conversions / attempted_conversions) * 100 if attempted_conversions > 0 else 0
-    total_penalties = len(week_data[week_data['Action'] == 'Penalty'])
-
-    # Create a dictionary for the summary
+def summarize_week(week_number, week_totals):
+    """Build the weekly summary dictionary from one row of weekly totals, with the rows of WEEK_REPORT."""
     summary = {
         'Week': week_number,
-        'Opponent Name': opponent,
-        'Outcome': outcome,
-        'LA Clams Score': clams_points_scored,
-        'Opponent Score': total_points_allowed,
-        'Total Plays': num_plays,
-        'Total Offensive Plays': num_offense_plays,
-        'Total Defensive Plays': num_defense_plays,
-        '% Plays on Offense': percent_plays_offense,
-        'Successful Offensive Plays': successful_offense,
-        '% Successful Offensive Plays': pct_successful_offense,
-        'Successful Defensive Stops': successful_defense,
-        '% Successful Defensive Stops': pct_successful_defense,
-        'Passing TDs': passing_tds,
-        'Rushing TDs': rushing_tds,
-        'Total TDs': total_tds,
-        'Int (while on offense)': interceptions_offense,
-        'Int (while on defense)': interceptions_defense,
-        'Total Rushing Yards': total_rushing_yards,
-        'Total Receiving Yards': total_receiving_yards,
-        'Total Flags Pulled': total_flags_pulled,
-        'Successful Conversions': successful_conversions,
-        'Attempted Conversions': attempted_conversions,
-        'Conversion Rate': conversion_rate,
-        'Total Penalties': total_penalties,
+        'Opponent Name': week_totals['Opponent'],
+        'Outcome': "W" if week_totals['LA Clams Points'] > week_totals['Opponent Points'] else "L",
     }
+    summary.update({label: team_stat(week_totals, stat) for label, stat in WEEK_REPORT})
+    return summary
 
-    display_data_as_table(summary)
 
+def summarize_season(weekly_totals):
+    """Build the season averages dictionary from the per-week totals table, with the rows of SEASON_REPORT."""
+    num_games = len(weekly_totals)
 
-def calculate_average_stats(data, player_name):
-    player_actions, player_on_field = get_player_data(data, player_name)
-    
-    games_played = player_on_field['Week'].nunique()
-
-    # Calculate various statistics
-    total_rushing_yards = calculate_statistic(player_actions, 
-                                              (player_actions['Action'] == 'Run') & 
-                                              (player_actions['Offense/Defense'] == 'Offense'), 
-                                              'Yards')
-    avg_rushing_yards_per_game = calculate_average_per_game(total_rushing_yards, games_played)
-
-    total_receiving_yards = calculate_statistic(player_actions, 
-                                                (player_actions['Action'] == 'Pass') & 
-                                                (player_actions['Offense/Defense'] == 'Offense'), 
-                                                'Yards')
-    avg_receiving_yards_per_game = calculate_average_per_game(total_receiving_yards, games_played)
-
-    total_rushing_tds = calculate_statistic(player_actions, 
-                                            (player_actions['Touchdown Type'] == 'Rushing Touchdown') & 
-                                            (player_actions['Offense/Defense'] == 'Offense'), 
-                                            None, 
-                                            aggregation='count')
-    avg_rushing_tds_per_game = calculate_average_per_game(total_rushing_tds, games_played)
-
-    total_receiving_tds = calculate_statistic(player_actions, 
-                                              (player_actions['Touchdown Type'] == 'Passing Touchdown') & 
-                                              (player_actions['Offense/Defense'] == 'Offense'), 
-                                              None, 
-                                              aggregation='count')
-    avg_receiving_tds_per_game = calculate_average_per_game(total_receiving_tds, games_played)
-
-    sacks = calculate_statistic(player_actions, 
-                                (player_actions['Action'] == 'Sack') & 
-                                (player_actions['Offense/Defense'] == 'Defense'), 
-                                None, 
-                                aggregation='count')
-    avg_sacks_per_game = calculate_average_per_game(sacks, games_played)
-
-    flags_pulled = calculate_statistic(player_actions, 
-                                       (player_actions['Action'] == 'Flag Pull') & 
-                                       (player_actions['Offense/Defense'] == 'Defense'), 
-                                       None, 
-                                       aggregation='count') + sacks
-    avg_flags_pulled_per_game = calculate_average_per_game(flags_pulled, games_played)
-
-    # Positions played
-    all_positions = extract_positions(player_on_field, player_name)
-    offensive_positions = ['Quarterback', 'Wide Receiver', 'Running Back', 'Tight End', 'Center']
-    defensive_positions = ['Pass Rusher', 'Corner Back', 'Safety']
-    player_offensive_positions = [pos for pos in all_positions if pos in offensive_positions]
-    player_defensive_positions = [pos for pos in all_positions if pos in defensive_positions]
-
-    most_common_offensive_position = Counter(player_offensive_positions).most_common(1)[0][0] if player_offensive_positions else 'N/A'
-    most_common_defensive_position = Counter(player_defensive_positions).most_common(1)[0][0] if player_defensive_positions else 'N/A'
-
-    # Calculate total passing yards for the season when the player is a quarterback
-    total_passing_yards = calculate_quarterback_stats(data, player_name)
-    avg_passing_yards_per_game = 'N/A' if total_passing_yards == 'N/A' else total_passing_yards / games_played
-
-    # Calculate number of offensive and defensive plays
-    offensive_plays, defensive_plays = calculate_offensive_defensive_plays(player_on_field)
-
-    # Calculate averages based on the number of games played
-    avg_offensive_plays = offensive_plays / games_played if games_played else 0
-    avg_defensive_plays = defensive_plays / games_played if games_played else 0
+    # Per-game percentages are averaged across weeks, not recomputed from season totals
+    def average(stat):
+        return round(team_stat(weekly_totals, stat).sum() / num_games, 1)
 
-    # Compile all the statistics
-    avg_stats = {
-        'Games Played (w/stats available)': games_played,
-        'Most Common Offensive Position': most_common_offensive_position,
-        'Most Common Defensive Position': most_common_defensive_position,
-        'Average Passing Yards per Game': avg_passing_yards_per_game,
-        'Average Rushing Yards per Game': avg_rushing_yards_per_game,
-        'Average Receiving Yards per Game': avg_receiving_yards_per_game,
-        'Average Rushing TDs per Game': avg_rushing_tds_per_game,
-        'Average Receiving TDs per Game': avg_receiving_tds_per_game,
-        'Average # Flags Pulled per Game': avg_flags_pulled_per_game,
-        'Average Sacks per Game': avg_sacks_per_game,
-        'Average # Offensive Plays on Field per Game': avg_offensive_plays,
-        'Average # Defensive Plays on Field per Game': avg_defensive_plays,
-    }
+    summary = {'Games Played (w/stats)': num_games}
+    for label, stat in SEASON_REPORT:
+        if isinstance(stat, tuple):
+            numerator, denominator = average(stat[0]), average(stat[1])
+            value = round(percent(numerator, denominator), 1)
+        else:
+            value = average(stat)
+        summary[label] = f"{value:.1f}"
+    return summary
 
-    display_data_as_table(avg_stats)
 
+@profiled
+def calculate_season_statistics(data, weekly_totals=None):
+    # Compute all per-week totals in one pass (unless already computed, in which case data may be None),
+    # then the season averages from them
+    if weekly_totals is None:
+        weekly_totals = compute_weekly_totals(data)
+    season_averages_summary = summarize_season(weekly_totals)
 
-def calculate_individual_player_stats(data, selected_week, selected_player):
-    # Filter data for the specific player and week
-    week_data = data[data['Week'] == selected_week]
-    player_actions, player_on_field = get_player_data(week_data, selected_player)
-
-    # Calculate various statistics for the specific game
-    total_rushing_yards = calculate_statistic(player_actions, 
-                                              (player_actions['Action'] == 'Run') & 
-                                              (player_actions['Offense/Defense'] == 'Offense'), 
-                                              'Yards')
-    
-    total_receiving_yards = calculate_statistic(player_actions, 
-                                                (player_actions['Action'] == 'Pass') & 
-                                                (player_actions['Offense/Defense'] == 'Offense'), 
-                                                'Yards')
-    
-    total_rushing_tds = calculate_statistic(player_actions, 
-                                            (player_actions['Touchdown Type'] == 'Rushing Touchdown') & 
-                                            (player_actions['Offense/Defense'] == 'Offense'), 
-                                            None, 
-                                            aggregation='count')
-    
-    total_receiving_tds = calculate_statistic(player_actions, 
-                                              (player_actions['Touchdown Type'] == 'Passing Touchdown') & 
-                                              (player_actions['Offense/Defense'] == 'Offense'), 
-                                              None, 
-                                              aggregation='count')
-    
-    sacks = calculate_statistic(player_actions, 
-                                (player_actions['Action'] == 'Sack') & 
-                                (player_actions['Offense/Defense'] == 'Defense'), 
-                                None, 
-                                aggregation='count')
-
-    flags_pulled = calculate_statistic(player_actions, 
-                                       (player_actions['Action'] == 'Flag Pull') & 
-                                       (player_actions['Offense/Defense'] == 'Defense'), 
-                                       None, 
-                                       aggregation='count') + sacks
+    # Display the season average summary
+    st.subheader('Season Averages')
+    display_data_as_table(season_averages_summary)
 
-    # Calculate the success rates
-    offensive_plays = player_on_field[player_on_field['Offense/Defense'] == 'Offense']
-    successful_offense = offensive_plays[offensive_plays['Yards'] > 0].shape[0]
-    pct_successful_offense = (successful_offense / offensive_plays.shape[0]) * 100 if offensive_plays.shape[0] > 0 else 0
+    return weekly_totals, season_averages_summary
 
-    defensive_plays = player_on_field[player_on_field['Offense/Defense'] == 'Defense']
-    successful_defense = defensive_plays[defensive_plays['Yards'] <= 0].shape[0]
-    pct_successful_defense = (successful_defense / defensive_plays.shape[0]) * 100 if defensive_plays.shape[0] > 0 else 0
 
-    # Extract positions played during the game
-    all_positions = extract_positions(player_on_field, selected_player)
-    offensive_positions = ['Quarterback', 'Wide Receiver', 'Running Back', 'Tight End', 'Center']
-    defensive_positions = ['Pass Rusher', 'Corner Back', 'Safety']
+@profiled
+def calculate_weekly_statistics(week_data, week_number, weekly_totals=None):
+    # Compute the week's totals (unless already computed, in which case week_data may be None)
+    # and build the summary from them
+    if weekly_totals is None:
+        weekly_totals = compute_weekly_totals(week_data)
+    week_totals = weekly_totals.loc[week_number]
+    summary = summarize_week(week_number, week_totals)
 
-    player_offensive_positions = [pos for pos in all_positions if pos in offensive_positions]
-    player_defensive_positions = [pos for pos in all_positions if pos in defensive_positions]
+    display_data_as_table(summary)
 
-    most_common_offensive_position = Counter(player_offensive_positions).most_common(1)[0][0] if player_offensive_positions else 'N/A'
-    most_common_defensive_position = Counter(player_defensive_positions).most_common(1)[0][0] if player_defensive_positions else 'N/A'
+    return summary
+
+
+OFFENSIVE_POSITIONS = ['Quarterback', 'Wide Receiver', 'Running Back', 'Tight End', 'Center']
+DEFENSIVE_POSITIONS = ['Pass Rusher', 'Corner Back', 'Safety']
+
+# Numeric columns of the player totals matrix
+PLAYER_TOTAL_COLUMNS = [
+    'Games Played', 'Quarterback Plays', 'Passing Yards', 'Rushing Yards', 'Receiving Yards',
+    'Rushing TDs', 'Receiving TDs', 'Sacks', 'Flags Pulled', 'Offensive Plays', 'Defensive Plays',
+    'Successful Offensive Plays', 'Successful Defensive Plays',
+]
+
+
+def most_common_position(entries, keys, positions):
+    """Pick each player's most frequent position among `positions`, ties going to the one played first."""
+    entries = entries[entries['Position'].isin(positions)]
+    counts = entries.groupby(keys + ['Position'], observed=True).agg(count=('Order', 'size'), first=('Order', 'min'))
+    counts = counts.reset_index().sort_values(['count', 'first'], ascending=[False, True])
+    return counts.drop_duplicates(keys).set_index(keys)['Position'].astype(object)
+
+
+@profiled
+def compute_player_totals(data, position_index=None, by_week=False):
+    """Compute every player's season (or per-week) totals in one grouped pass over actions and lineups."""
+    if position_index is None:
+        position_index = build_position_index(data)
+    keys = ['Week', 'Player'] if by_week else ['Player']
+
+    # Stats credited to the player involved in the action
+    credited = data[data['Player Involved'] != 'No specific player'].rename(columns={'Player Involved': 'Player'})
+    action_totals = evaluate_stats(credited, PLAYER_ACTION_STATS, by=keys)
+
+    # Stats from the plays each player was on the field for, one row per (play, player) entry
+    entries = position_index[position_index['Row'].isin(data.index)]
+    plays = data.loc[entries['Row'], ['Week', 'Offense/Defense', 'Yards', 'Pass Outcome']]
+    entries = pd.DataFrame({
+        'Order': range(len(entries)),
+        'Row': entries['Row'].to_numpy(),
+        'Player': entries['Player'].astype(object).to_numpy(),
+        'Position': entries['Position'].astype(object).to_numpy(),
+        **{column: plays[column].array for column in plays.columns},
+    })
+    # A player listed twice in one lineup still only played that snap once
+    snaps = entries.drop_duplicates(['Row', 'Player'])
+    on_field_totals = evaluate_stats(snaps, PLAYER_FIELD_STATS, by=keys)
+    on_field_totals.insert(0, 'Games Played', snaps.groupby(keys)['Week'].nunique())
+    quarterback_snaps = entries[entries['Position'] == 'Quarterback'].drop_duplicates(['Row', 'Player'])
+    on_field_totals = on_field_totals.join(evaluate_stats(quarterback_snaps, QUARTERBACK_STATS, by=keys))
+
+    # Combine into one players x stats matrix, with every roster player present in the season view
+    player_totals = on_field_totals.join(action_totals, how='outer')
+    if not by_week:
+        player_totals = player_totals.reindex(player_totals.index.union(get_players())).rename_axis('Player')
+    player_totals = player_totals[PLAYER_TOTAL_COLUMNS].fillna(0).astype('int64')
+    player_totals['Offensive Position'] = most_common_position(entries, keys, OFFENSIVE_POSITIONS)
+    player_totals['Defensive Position'] = most_common_position(entries, keys, DEFENSIVE_POSITIONS)
+    player_totals[['Offensive Position', 'Defensive Position']] = player_totals[['Offensive Position', 'Defensive Position']].fillna('N/A')
+    return player_totals
+
+
+def lookup_player_totals(player_totals, key):
+    """Return one row of the player totals matrix as a dict, with zero totals for players without plays."""
+    if key in player_totals.index:
+        return player_totals.loc[key].to_dict()
+    totals = dict.fromkeys(PLAYER_TOTAL_COLUMNS, 0)
+    totals.update({'Offensive Position': 'N/A', 'Defensive Position': 'N/A'})
+    return totals
+
+
+def summarize_player_season(totals):
+    """Build the season averages table of one player from their row of the player totals."""
+    games_played = totals['Games Played']
+
+    # Passing yards only count when the player was the quarterback
+    if totals['Quarterback Plays'] == 0:
+        avg_passing_yards_per_game = 'N/A'
+    else:
+        avg_passing_yards_per_game = totals['Passing Yards'] / games_played
 
-    # Calculate passing yards for the specific game when the player is a quarterback
-    week_data = data[data['Week'] == selected_week]
-    total_passing_yards = calculate_quarterback_stats(week_data, selected_player)
+    # Compile all the statistics
+    avg_stats = {
+        'Games Played (w/stats available)': games_played,
+        'Most Common Offensive Position': totals['Offensive Position'],
+        'Most Common Defensive Position': totals['Defensive Position'],
+        'Average Passing Yards per Game': avg_passing_yards_per_game,
+        'Average Rushing Yards per Game': calculate_average_per_game(totals['Rushing Yards'], games_played),
+        'Average Receiving Yards per Game': calculate_average_per_game(totals['Receiving Yards'], games_played),
+        'Average Rushing TDs per Game': calculate_average_per_game(totals['Rushing TDs'], games_played),
+        'Average Receiving TDs per Game': calculate_average_per_game(totals['Receiving TDs'], games_played),
+        'Average # Flags Pulled per Game': calculate_average_per_game(totals['Flags Pulled'], games_played),
+        'Average Sacks per Game': calculate_average_per_game(totals['Sacks'], games_played),
+        'Average # Offensive Plays on Field per Game': calculate_average_per_game(totals['Offensive Plays'], games_played),
+        'Average # Defensive Plays on Field per Game': calculate_average_per_game(totals['Defensive Plays'], games_played),
+    }
+    return avg_stats
 
-    # Calculate number of offensive and defensive plays
-    offensive_plays, defensive_plays = calculate_offensive_defensive_plays(player_on_field)
+
+def summarize_player_week(totals):
+    """Build the per-game table of one player from their row of the per-week player totals."""
+    # Calculate the success rates
+    offensive_plays = totals['Offensive Plays']
+    defensive_plays = totals['Defensive Plays']
+    pct_successful_offense = (totals['Successful Offensive Plays'] / offensive_plays) * 100 if offensive_plays > 0 else 0
+    pct_successful_defense = (totals['Successful Defensive Plays'] / defensive_plays) * 100 if defensive_plays > 0 else 0
 
     # Assemble the game-specific statistics
     game_stats = {
-        'Position (Offensive)': most_common_offensive_position,
-        'Position (Defense)': most_common_defensive_position,
-        'Passing yards': total_passing_yards,
-        'Rushing yards': total_rushing_yards,
-        'Receiving yards': total_receiving_yards,
-        'Rushing TDs': total_rushing_tds,
-        'Receiving TDs': total_receiving_tds,
-        'Sacks': sacks,
-        'Flags pulled': flags_pulled,
+        'Position (Offensive)': totals['Offensive Position'],
+        'Position (Defense)': totals['Defensive Position'],
+        'Passing yards': 'N/A' if totals['Quarterback Plays'] == 0 else totals['Passing Yards'],
+        'Rushing yards': totals['Rushing Yards'],
+        'Receiving yards': totals['Receiving Yards'],
+        'Rushing TDs': totals['Rushing TDs'],
+        'Receiving TDs': totals['Receiving TDs'],
+        'Sacks': totals['Sacks'],
+        'Flags pulled': totals['Flags Pulled'],
         'Number of offensive plays': offensive_plays,
         'Successful offensive plays (%)': pct_successful_offense,
         'Number of defensive plays': defensive_plays,
         'Successful defensive plays (%)': pct_successful_defense,
 
     }
+    return game_stats
+
+
+@profiled
+def calculate_average_stats(data, player_name, position_index=None, player_totals=None):
+    # Look the player up in the whole-roster totals, computing them if they were not passed in
+    if player_totals is None:
+        player_totals = compute_player_totals(data, position_index)
+    avg_stats = summarize_player_season(lookup_player_totals(player_totals, player_name))
+
+    display_data_as_table(avg_stats)
+
+    return avg_stats
+
+
+@profiled
+def calculate_individual_player_stats(data, selected_week, selected_player, position_index=None, player_week_totals=None):
+    # Look the player and week up in the per-week totals, computing just this week if they were not passed in
+    if player_week_totals is None:
+        player_week_totals = compute_player_totals(data[data['Week'] == selected_week], position_index, by_week=True)
+    game_stats = summarize_player_week(lookup_player_totals(player_week_totals, (selected_week, selected_player)))
 
     display_data_as_table(game_stats)
 
+    return game_stats
+
+
+# Games in the "last N games" window of the recent form section
+FORM_WINDOW = 3
+
+
+@profiled
+def rolling_totals(weekly_totals, window=FORM_WINDOW, weeks=None):
+    """Totals of every numeric column over the last `window` games, as of each game.
+
+    `weekly_totals` is indexed by week, or by (week, player) for the per-week player totals, and
+    `weeks` are the games to move over (by default the weeks in the index). The window is kept as a
+    running total: each game adds its week and subtracts the week that leaves the window, so a
+    step costs one week of totals however long the season or archive. 'Games' counts the team's
+    games in the window.
+    """
+    numeric = weekly_totals.select_dtypes('number')
+    by_player = numeric.index.nlevels > 1
+    weeks = sorted(numeric.index.get_level_values(0).unique() if weeks is None else weeks)
+    players = sorted(numeric.index.get_level_values(1).unique()) if by_player else [None]
+
+    # A (week x player x stat) cube of the weekly totals, with zeros for weeks a player had no plays
+    if by_player:
+        numeric = numeric.reindex(pd.MultiIndex.from_product([weeks, players], names=numeric.index.names), fill_value=0)
+    else:
+        numeric = numeric.reindex(pd.Index(weeks, name=numeric.index.name), fill_value=0)
+    cube = numeric.to_numpy(dtype=np.int64).reshape(len(weeks), len(players), -1)
+
+    windows = np.empty_like(cube)
+    running = np.zeros(cube.shape[1:], dtype=np.int64)
+    for position in range(len(weeks)):
+        running += cube[position]
+        if position >= window:
+            running -= cube[position - window]
+        windows[position] = running
+
+    rolling = pd.DataFrame(windows.reshape(-1, cube.shape[2]), index=numeric.index, columns=numeric.columns)
+    rolling['Games'] = np.repeat(np.minimum(np.arange(1, len(weeks) + 1), window), len(players))
+    return rolling
+
+
+def summarize_team_form(rolling):
+    """Per-game team averages over each game's window, one column per team stat."""
+    return (rolling.drop(columns='Games').div(rolling['Games'], axis=0)).round(1)
+
+
+def summarize_player_form(rolling):
+    """Per-game player averages over the games they played in each window; None where they played none."""
+    games_played = rolling['Games Played'].where(rolling['Games Played'] > 0)
+    return rolling.drop(columns=['Games', 'Games Played']).div(games_played, axis=0).round(1)
+
+
+@profiled
+def calculate_team_form(rolling, stats):
+    # Trend lines of the chosen team stats, averaged over the last games as of each week
+    form = summarize_team_form(rolling)[stats]
+    st.line_chart(form)
+    return form
+
+
+@profiled
+def calculate_player_form(rolling, player_name, stats):
+    # The same trend lines for one player, from the rolling totals of the whole roster
+    if player_name not in rolling.index.get_level_values('Player'):
+        st.info(f"{player_name} has no recorded plays this season.")
+        return None
+    form = summarize_player_form(rolling).xs(player_name, level='Player')[stats]
+    st.line_chart(form)
+    return form
@@ -0,0 +1,25 @@
+import argparse
+
+from src.storage import open_season
+
+
+def migrate(source, target, season=None):
+    """Copy every play of a season from one store to another, e.g. from the CSV to Parquet, SQLite or a seasons directory."""
+    data = open_season(season, source).read()
+    open_season(season, target).write(data)
+    return len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy the team stats between storage backends.")
+    parser.add_argument('source', help="Store to read from, e.g. team_stats.csv")
+    parser.add_argument('target', help="Store to write to, e.g. team_stats.parquet, team_stats.sqlite or a seasons directory")
+    parser.add_argument('--season', help="Season to read from or write to in a partitioned (directory) store")
+    args = parser.parse_args()
+
+    plays = migrate(args.source, args.target, args.season)
+    print(f"Copied {plays} plays from {args.source} to {args.target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Timings are only recorded when switched on, from the Diagnostics page or with STATS_PROFILE=1
+enabled = os.environ.get('STATS_PROFILE', '') not in ('', '0')
+
+# Spans kept for the profile export; the per-name totals cover every span since the last reset
+MAX_EVENTS = 20_000
+
+_lock = threading.Lock()
+_totals = {}
+_events = deque(maxlen=MAX_EVENTS)
+_started = time.perf_counter()
+
+
+def enable(on=True):
+    """Start (or with on=False, stop) recording spans, for every session of this server."""
+    global enabled
+    enabled = on
+
+
+def reset():
+    """Forget every recorded span."""
+    with _lock:
+        _totals.clear()
+        _events.clear()
+
+
+def _record(name, start, seconds, rows):
+    with _lock:
+        totals = _totals.setdefault(name, {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'rows': 0})
+        totals['calls'] += 1
+        totals['seconds'] += seconds
+        totals['max_seconds'] = max(totals['max_seconds'], seconds)
+        totals['rows'] += rows or 0
+        _events.append((name, start - _started, seconds, threading.get_ident(), rows))
+
+
+@contextmanager
+def span(name, rows=None):
+    """Time the enclosed block as `name`; set span['rows'] inside the block to record rows read or written."""
+    details = {'rows': rows}
+    if not enabled:
+        yield details
+        return
+    start = time.perf_counter()
+    try:
+        yield details
+    finally:
+        _record(name, start, time.perf_counter() - start, details['rows'])
+
+
+def _rows(arguments, result):
+    # Rows of the first frame passed in, which is the data the function scans,
+    # or of the frame it returns when it reads its data itself
+    frame = next((argument for argument in arguments if isinstance(argument, pd.DataFrame)), None)
+    if frame is None and isinstance(result, tuple) and result:
+        result = result[0]
+    if frame is None and isinstance(result, pd.DataFrame):
+        frame = result
+    return None if frame is None else len(frame)
+
+
+def profiled(function=None, name=None):
+    """Decorator timing every call of a function, with the rows of the DataFrame it scans or reads."""
+    if function is None:
+        return functools.partial(profiled, name=name)
+    # Streamlit runs the page scripts as __main__, so those are named after their file instead
+    module = function.__module__.rsplit('.', 1)[-1]
+    if module == '__main__':
+        module = os.path.splitext(os.path.basename(function.__code__.co_filename))[0]
+    name = name or f"{module}.{function.__qualname__}"
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not enabled:
+            return function(*args, **kwargs)
+        start = time.perf_counter()
+        result = None
+        try:
+            result = function(*args, **kwargs)
+            return result
+        finally:
+            _record(name, start, time.perf_counter() - start, _rows([*args, *kwargs.values()], result))
+    return wrapper
+
+
+def summary():
+    """Calls, total, mean and slowest time, and rows per span name, slowest total first."""
+    with _lock:
+        rows = [{'Span': name, **totals} for name, totals in _totals.items()]
+    table = pd.DataFrame(rows, columns=['Span', 'calls', 'seconds', 'max_seconds', 'rows'])
+    return pd.DataFrame({
+        'Span': table['Span'],
+        'Calls': table['calls'],
+        'Total (ms)': table['seconds'] * 1000,
+        'Mean (ms)': table['seconds'] * 1000 / table['calls'],
+        'Max (ms)': table['max_seconds'] * 1000,
+        'Rows': table['rows'],
+    }).sort_values('Total (ms)', ascending=False, ignore_index=True)
+
+
+def export_trace():
+    """The recorded spans in the Chrome trace event format, to open in chrome://tracing or Perfetto."""
+    with _lock:
+        events = list(_events)
+    trace = [{
+        'name': name,
+        'ph': 'X',
+        'ts': round(start * 1e6),
+        'dur': round(seconds * 1e6),
+        'pid': os.getpid(),
+        'tid': thread,
+        'args': {} if rows is None else {'rows': rows},
+    } for name, start, seconds, thread, rows in events]
+    return json.dumps({'traceEvents': trace, 'displayTimeUnit': 'ms'})
@@ -0,0 +1,62 @@
+import threading
+from collections import OrderedDict
+
+from src.profiling import span
+
+# Report dicts (the season, week and player tables) are kept per (section, season, data version, week, player),
+# so a rerun only builds the tables whose own inputs changed. The cache is shared by every session of
+# the server; once it holds MAX_REPORTS, the least recently used report is dropped.
+MAX_REPORTS = 512
+
+_lock = threading.Lock()
+_reports = OrderedDict()
+_counts = {'hits': 0, 'misses': 0}
+
+
+def _hashable(value):
+    # Store versions may be lists (a partitioned season's is a list of [week, version] pairs); as tuples they can be keys
+    if isinstance(value, list):
+        return tuple(_hashable(item) for item in value)
+    return value
+
+
+def cached_report(section, build, season, version, week=None, player=None):
+    """The report `build()` returns for this section, season, data version, week and player, built once and reused.
+
+    Reports are shared, so callers must not change the dict they get back.
+    """
+    key = (section, season, _hashable(version), week, player)
+    with _lock:
+        if key in _reports:
+            _reports.move_to_end(key)
+            _counts['hits'] += 1
+            return _reports[key]
+        _counts['misses'] += 1
+    # Build outside the lock, so one slow report does not hold up the other sessions
+    with span(f"report: {section}"):
+        report = build()
+    with _lock:
+        _reports[key] = report
+        _reports.move_to_end(key)
+        while len(_reports) > MAX_REPORTS:
+            _reports.popitem(last=False)
+    return report
+
+
+def stats():
+    """Reports cached, hits and misses since the last reset, for the Diagnostics page."""
+    with _lock:
+        lookups = _counts['hits'] + _counts['misses']
+        return {
+            'Reports cached': len(_reports),
+            'Hits': _counts['hits'],
+            'Misses': _counts['misses'],
+            'Hit rate (%)': 100 * _counts['hits'] / lookups if lookups else 0.0,
+        }
+
+
+def reset():
+    """Forget every cached report and zero the counters."""
+    with _lock:
+        _reports.clear()
+        _counts.update(hits=0, misses=0)
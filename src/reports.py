@@ -0,0 +1,123 @@
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from src.aggregates import load_weekly_aggregates
+from src.metrics import (compute_player_totals, compute_weekly_totals, lookup_player_totals, summarize_player_season,
+                         summarize_player_week, summarize_season, summarize_week)
+from src.schema import METRIC_COLUMNS
+from src.setup import build_position_index, format_data_as_table, get_players
+from src.storage import list_seasons, load_team_stats, open_season
+
+FORMATS = ['csv', 'json', 'html']
+
+
+def slugify(name):
+    """File-name friendly version of a season or player name, e.g. 'Fall 2023' -> 'fall-2023'."""
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+def write_report(out, path, summary, format='csv'):
+    """Write one summary as the same Statistic/Value table the dashboard shows, and return its relative path."""
+    path = f"{path}.{format}"
+    target = os.path.join(out, path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+
+    table = format_data_as_table(summary)
+    if format == 'csv':
+        table.to_csv(target, index=False)
+    elif format == 'html':
+        table.to_html(target, index=False)
+    else:
+        with open(target, 'w', encoding='utf-8') as file:
+            json.dump(dict(zip(table['Statistic'], table['Value'])), file, indent=2, ensure_ascii=False,
+                      default=lambda value: value.item())
+    return path
+
+
+def season_reports(out, season, location=None, format='csv'):
+    """Write the season averages and every player's season averages for one season."""
+    store = open_season(season, location)
+    prefix = slugify(season)
+    written = [write_report(out, f"{prefix}/season", summarize_season(load_weekly_aggregates(store)), format)]
+
+    data, load_report = load_team_stats(store, columns=METRIC_COLUMNS)
+    player_totals = compute_player_totals(data, build_position_index(data))
+    for player in sorted(get_players()):
+        summary = summarize_player_season(lookup_player_totals(player_totals, player))
+        written.append(write_report(out, f"{prefix}/players/{slugify(player)}/season", summary, format))
+    return written
+
+
+def week_reports(out, season, week, location=None, format='csv'):
+    """Write one week's game summary and every player's stats for that game, reading only that week."""
+    data, load_report = load_team_stats(open_season(season, location), columns=METRIC_COLUMNS, weeks=[week])
+    prefix = slugify(season)
+    weekly_totals = compute_weekly_totals(data)
+    written = [write_report(out, f"{prefix}/week-{week}", summarize_week(week, weekly_totals.loc[week]), format)]
+
+    player_week_totals = compute_player_totals(data, build_position_index(data), by_week=True)
+    for player in sorted(get_players()):
+        summary = summarize_player_week(lookup_player_totals(player_week_totals, (week, player)))
+        written.append(write_report(out, f"{prefix}/players/{slugify(player)}/week-{week}", summary, format))
+    return written
+
+
+def report_tasks(seasons, location=None):
+    """One task per season (season and player averages) and one per week with plays (game and player stats)."""
+    tasks = []
+    for season in seasons:
+        # The weeks come from the per-week totals, so listing them does not read any plays
+        weeks = load_weekly_aggregates(open_season(season, location)).index
+        tasks.append((season_reports, season))
+        tasks.extend((week_reports, season, int(week)) for week in weeks)
+    return tasks
+
+
+def generate_reports(out, seasons=None, location=None, workers=None, format='csv'):
+    """Write every season, weekly, player and player-per-week report, fanning the work out over processes.
+
+    Returns the index of written reports, which is also saved as index.json in `out`.
+    """
+    seasons = seasons or list_seasons(location)
+    start = time.perf_counter()
+    tasks = report_tasks(seasons, location)
+
+    if workers == 1:
+        results = [task(out, *arguments, location=location, format=format) for task, *arguments in tasks]
+    else:
+        # Each task reads its own season or week from the store, so only paths cross process boundaries
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(task, out, *arguments, location=location, format=format) for task, *arguments in tasks]
+            results = [future.result() for future in futures]
+
+    index = {
+        'seasons': seasons,
+        'format': format,
+        'seconds': round(time.perf_counter() - start, 3),
+        'reports': sorted(path for written in results for path in written),
+    }
+    with open(os.path.join(out, 'index.json'), 'w', encoding='utf-8') as file:
+        json.dump(index, file, indent=2, ensure_ascii=False)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write every season, weekly and player report as static files.")
+    parser.add_argument('--out', default='reports', help="Directory to write the reports to")
+    parser.add_argument('--store', help="Store to read (defaults to STATS_STORE or team_stats.csv)")
+    parser.add_argument('--season', action='append', dest='seasons', help="Season to report on (repeatable; defaults to all)")
+    parser.add_argument('--workers', type=int, help="Worker processes (defaults to the number of CPUs; 1 runs in-process)")
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    index = generate_reports(args.out, args.seasons, args.store, args.workers, args.format)
+    print(f"Wrote {len(index['reports'])} reports for {len(index['seasons'])} season(s) to {args.out} in {index['seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
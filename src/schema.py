@@ -0,0 +1,67 @@
+import numpy as np
+
+# Column order of team_stats.csv
+COLUMNS = [
+    'Week', 'Opponent', 'Half', 'Down', 'Yards to Go',
+    'Play', 'Offense/Defense', 'Players on Field', 'Player Positions', 'Action',
+    'Player Involved', 'Touchdown Type', 'Pass Outcome', 'Conversion Outcome', 'Yards', 'Points', 'Notes'
+]
+
+# Columns read by src/metrics.py and src/setup.py; the dashboard loads only these
+METRIC_COLUMNS = [
+    'Week', 'Opponent', 'Offense/Defense', 'Player Positions', 'Action', 'Player Involved',
+    'Touchdown Type', 'Pass Outcome', 'Conversion Outcome', 'Yards', 'Points'
+]
+
+# Known values for the categorical columns, in a fixed order so the integer codes are stable between loads.
+# An empty list means the categories are taken from the data (e.g. opponent names).
+CATEGORIES = {
+    'Opponent': [],
+    'Half': ['1st', '2nd'],
+    'Offense/Defense': ['Offense', 'Defense'],
+    'Action': ['Pass', 'Run', 'Flag Pull', 'Touchdown', 'Conversion', 'Interception', 'Forced Fumble', 'Sack', 'Pick-Six', 'Penalty'],
+    'Touchdown Type': ['Passing Touchdown', 'Rushing Touchdown'],
+    'Pass Outcome': ['Complete', 'Incomplete'],
+    'Conversion Outcome': ['Complete', 'Incomplete'],
+}
+
+# Smallest integer type that holds each numeric column. astype wraps values that do not fit (200 becomes -56 in
+# an int8), so every input path keeps values within largest_value()
+INTEGERS = {
+    'Week': 'int16',
+    'Down': 'int8',
+    'Yards to Go': 'int16',
+    # Archives and generated benchmark data can run past 32767 plays in a week
+    'Play': 'int32',
+    'Yards': 'int8',
+    'Points': 'int8',
+}
+
+
+def largest_value(column):
+    """The largest value a numeric column's schema type holds."""
+    return int(np.iinfo(INTEGERS[column]).max)
+
+
+def apply_schema(data):
+    """Convert a raw plays frame to the typed representation used by the metrics."""
+    data = data.copy()
+    for column, dtype in INTEGERS.items():
+        if column in data:
+            data[column] = data[column].astype(dtype)
+    for column, known in CATEGORIES.items():
+        if column not in data:
+            continue
+        values = data[column].astype('category')
+        # Keep the known categories first so every value compares as an integer code,
+        # and append anything unexpected instead of silently dropping it
+        extra = sorted(set(values.cat.categories) - set(known))
+        data[column] = values.cat.set_categories(known + extra)
+    return data
+
+
+def schema_dtypes():
+    """Dtypes to pass to read_csv so the columns are parsed straight into their schema types."""
+    dtypes = {column: 'category' for column in CATEGORIES}
+    dtypes.update(INTEGERS)
+    return dtypes
@@ -1,42 +1,31 @@
+import io
+
+import numpy as np
 import pandas as pd
 import streamlit as st
-
-# Function to format the numbers in the DataFrame
-def format_float(val):
-    if isinstance(val, float):
-        return f"{val:.1f}"
-    return val
-
-
-def get_player_data(data, player_name):
-    """Retrieve data entries where the player was involved or on the field."""
-    player_actions = data[data['Player Involved'] == player_name]
-    player_on_field = data[data['Player Positions'].str.contains(player_name, na=False)]
-    return player_actions, player_on_field
-
-
-def calculate_statistic(data, filter_conditions, stat_field, aggregation='sum'):
-    """Calculate statistics based on specified conditions."""
-    filtered_data = data[filter_conditions]
-    if aggregation == 'sum':
-        return filtered_data[stat_field].sum()
-    elif aggregation == 'count':
-        return filtered_data.shape[0]
-    else:
-        return None 
-    
-
-def extract_positions(player_on_field, player_name):
-    """Extract the positions a player has played during the games."""
-    all_positions = []
-    for positions in player_on_field['Player Positions']:
-        if pd.notnull(positions):
-            position_entries = positions.split(', ')
-            for entry in position_entries:
-                name, position = entry.split(' as ')
-                if name.strip() == player_name:
-                    all_positions.append(position.strip())
-    return all_positions
+from src.profiling import profiled
+
+
+@profiled
+def build_position_index(data):
+    """Parse the 'Player Positions' lineups once into a long (play, player, position) table."""
+    # The same lineups come back play after play, so each distinct lineup is parsed once
+    codes, lineups = pd.factorize(data['Player Positions'])
+    # "Name as Position, Name as Position, ..." -> one row per player on the field
+    entries = pd.Series(lineups).str.split(', ').explode()
+    parts = entries.str.extract(r'^\s*(?P<Player>.*?) as (?P<Position>.*?)\s*$')
+
+    # Then every play gets its lineup's entries, in order; plays without a lineup (code -1) get none
+    sizes = np.bincount(entries.index, minlength=len(lineups))
+    plays = np.flatnonzero(codes >= 0)
+    counts = sizes[codes[plays]]
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    taken = np.repeat((np.cumsum(sizes) - sizes)[codes[plays]], counts) + offsets
+    return pd.DataFrame({
+        'Row': data.index[np.repeat(plays, counts)],
+        'Player': parts['Player'].astype('category').to_numpy()[taken],
+        'Position': parts['Position'].astype('category').to_numpy()[taken],
+    })
 
 
 def calculate_average_per_game(total, games_played):
@@ -44,35 +33,37 @@ def calculate_average_per_game(total, games_played):
     return total / games_played if games_played else 0
 
 
-def calculate_quarterback_stats(data, player_name):
-    """Calculate passing yards when the player is a quarterback."""
-    qb_plays = data[data['Player Positions'].apply(lambda x: player_name + ' as Quarterback' in x if x is not None else False)]
-    if qb_plays.empty:
-        return 'N/A'  # Return 'N/A' if there are no plays with the player as a quarterback
+def format_data_as_table(data):
+    # Create a DataFrame and transpose it for a vertical display
+    # Now, before displaying, ensure that all floating-point values are formatted to one decimal place
+    data = {k: (f"{v:.1f}" if isinstance(v, float) else v) for k, v in data.items()}
+    data_df = pd.DataFrame([data]).transpose().reset_index()
+    data_df.columns = ["Statistic", "Value"]
 
-    completed_passes = qb_plays[(qb_plays['Offense/Defense'] == 'Offense') & (qb_plays['Pass Outcome'] == 'Complete')]
-    total_passing_yards = completed_passes['Yards'].sum()
+    return data_df
 
-    return total_passing_yards
+@profiled
+def display_data_as_table(data):
+    st.table(format_data_as_table(data))
 
-def calculate_offensive_defensive_plays(player_on_field):
-    """Calculate the number of offensive and defensive plays."""
-    player_on_field_offense = player_on_field[player_on_field['Offense/Defense'] == 'Offense']
-    player_on_field_defense = player_on_field[player_on_field['Offense/Defense'] == 'Defense']
 
-    offensive_plays = player_on_field_offense.shape[0]
-    defensive_plays = player_on_field_defense.shape[0]
+# The logo's column is a third of the page (about 220 px), so it is sent at twice that for sharp high-DPI screens
+LOGO_WIDTH = 440
 
-    return offensive_plays, defensive_plays
 
-def display_data_as_table(data):
-    # Create a DataFrame and transpose it for a vertical display
-    # Now, before displaying, ensure that all floating-point values are formatted to one decimal place
-    data = {k: (f"{v:.1f}" if isinstance(v, float) else v) for k, v in data.items()}
-    data_df = pd.DataFrame([data]).transpose().reset_index()
-    data_df.columns = ["Statistic", "Value"]
+@st.cache_resource
+def load_logo(path="logo.png", width=LOGO_WIDTH):
+    """The logo scaled down to `width` pixels as JPEG bytes, resized once per server instead of on every rerun."""
+    # Pillow is only needed here, so it is not imported with the page
+    from PIL import Image
 
-    st.table(data_df)
+    # The logo has no transparent pixels, so a JPEG is a fraction of the size of the 854 KB PNG
+    with Image.open(path) as image:
+        image = image.convert("RGB")
+        image.thumbnail((width, width * image.height // image.width))
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
 
 
 def display_header():
@@ -81,13 +72,13 @@ def display_header():
 
     # The first and third columns are placeholders for centering the logo
     with col2:
-        st.image("logo.png")  # Display the logo in the second column
+        st.image(load_logo(), output_format="JPEG")  # Display the logo in the second column
 
     # Display the main title of the page
     st.title("LA Clams Statistics")
 
 
-@st.cache
+@st.cache_data
 def get_players():
     # Define players and positions
     return ['Astrid Carbajal', 'Bronwyn Thomas', 'Cassie Maino', 'Desiré Stephens', 'Dominique Benito', 'Emily Horrocks', 'Grace Snyder', 'Jasmine Plows', 'Jude Ladd Greeno', 'Kelsey Fisher', 'Mast Moronta', 'Miranda Sarah Einy', 'Molly Kaplan', 'Nadia Zadeh', 'Sophia Millay', 'Stefanie Visser']
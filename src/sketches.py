@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+from src.profiling import profiled
+from src.stats import Masks
+
+# Yardage distributions are kept as sketches: for each group of plays (a side, a player or a lineup in a week),
+# the number of plays that gained each number of yards. Yards are whole numbers (int8 in the schema), so a sketch
+# has at most one column per yardage, two sketches merge by adding their counts, and the percentiles read from a
+# merged sketch are the ones sorting the plays themselves would give; sketch_error checks that bound of zero.
+
+# A play gaining at least this many yards is explosive
+EXPLOSIVE_YARDS = 10
+
+# Percentiles shown for every distribution, next to the median
+PERCENTILES = [10, 25, 75, 90]
+
+# What each kind of sketch is kept per, besides the week: the side (offense is LA Clams' yardage, defense the
+# yardage allowed), the player involved in a run or pass (their yardage, as in PLAYER_ACTION_STATS) and the lineup
+TEAM_KEY = 'Offense/Defense'
+PLAYER_KEY = 'Player'
+LINEUP_KEY = 'Lineup'
+
+
+def _credited(data):
+    # Rushing and receiving plays of a player in particular
+    conditions = Masks(data)
+    return conditions.offense & (conditions.run | conditions.pass_play) & (data['Player Involved'] != 'No specific player').to_numpy()
+
+
+def build_sketches(yards, keys):
+    """Sketches of `yards` per group of `keys` (Series aligned with it): one row per group, one column per yardage."""
+    counts = pd.Series(np.ones(len(yards), dtype='int64'), index=yards.index).groupby([*keys, yards.rename('Yards')]).sum()
+    return counts.unstack('Yards', fill_value=0).sort_index(axis=1)
+
+
+@profiled
+def build_yardage_sketches(data, masks=None):
+    """Per-week yardage sketches of each side, each player and, given `masks` from encode_lineups, each lineup.
+
+    Returns {'Team': by (Week, Offense/Defense), 'Player': by (Week, Player), 'Lineup': by (Week, Lineup)}, the
+    lineup ones only counting the offensive plays of lineups on record, as LINEUP_STATS' 'Offensive Yards' does.
+    """
+    week, yards = data['Week'], data['Yards'].astype('int64')
+    sketches = {'Team': build_sketches(yards, [week, data[TEAM_KEY]])}
+
+    credited = _credited(data)
+    sketches['Player'] = build_sketches(yards[credited], [week[credited], data.loc[credited, 'Player Involved'].rename(PLAYER_KEY)])
+
+    if masks is not None:
+        lineups = pd.Series(masks, index=data.index, name=LINEUP_KEY)
+        on_record = (data['Offense/Defense'] == 'Offense').to_numpy() & (masks != 0)
+        sketches['Lineup'] = build_sketches(yards[on_record], [week[on_record], lineups[on_record]])
+    return sketches
+
+
+def merge_sketches(sketches, by=None):
+    """Add up sketches: per level(s) `by` of their index, e.g. 'Player' for every player's season, or all of them (None)."""
+    if by is None:
+        return sketches.sum()
+    return sketches.groupby(level=by).sum()
+
+
+def _ranks(total, percentile):
+    # Position of the percentile among a group's plays in yardage order, as pandas' quantile(interpolation='lower')
+    return np.floor(percentile / 100 * (total - 1))
+
+
+def yardage_stats(sketches):
+    """Plays, average, median, PERCENTILES and explosive-play rate of each sketch (row); NaN for empty sketches."""
+    counts = sketches.to_numpy(dtype='int64')
+    yards = sketches.columns.to_numpy(dtype='int64')
+    total = counts.sum(axis=1)
+    # Number of plays at or below each yardage; a percentile is the first yardage past its rank
+    running = counts.cumsum(axis=1)
+    has_plays = total > 0
+    stats = {'Plays': total}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        stats['Average Yards'] = counts @ yards / total
+        for name, percentile in [('Median Yards', 50), *[(f'{p}th Percentile Yards', p) for p in PERCENTILES]]:
+            position = (running <= _ranks(total, percentile)[:, None]).sum(axis=1)
+            stats[name] = np.where(has_plays, yards[np.minimum(position, len(yards) - 1)] if len(yards) else 0, np.nan)
+        stats['Explosive Plays (%)'] = 100 * counts[:, yards >= EXPLOSIVE_YARDS].sum(axis=1) / total
+    return pd.DataFrame(stats, index=sketches.index)
+
+
+def summarize_yardage(sketch):
+    """Build the yardage distribution table of one sketch (a row of sketches, or a merged one)."""
+    stats = yardage_stats(sketch.to_frame().T).iloc[0]
+    if not stats['Plays']:
+        return {'Plays': 0}
+    return {
+        'Plays': int(stats['Plays']),
+        'Average Yards per Play': f"{stats['Average Yards']:.1f}",
+        'Median Yards per Play': int(stats['Median Yards']),
+        **{f'{p}th Percentile Yards': int(stats[f'{p}th Percentile Yards']) for p in PERCENTILES},
+        f'Explosive Plays ({EXPLOSIVE_YARDS}+ yards, %)': f"{stats['Explosive Plays (%)']:.1f}",
+    }
+
+
+def exact_yardage_stats(yards, keys):
+    """The same stats as yardage_stats, sorted out of the plays' yardage per group of `keys` rather than read off sketches."""
+    groups = yards.astype('int64').groupby(keys)
+    stats = {
+        'Plays': groups.size(),
+        'Average Yards': groups.mean(),
+        'Median Yards': groups.quantile(0.5, interpolation='lower'),
+        **{f'{p}th Percentile Yards': groups.quantile(p / 100, interpolation='lower') for p in PERCENTILES},
+        'Explosive Plays (%)': 100 * (yards >= EXPLOSIVE_YARDS).groupby(keys).mean(),
+    }
+    return pd.DataFrame(stats)
+
+
+@profiled
+def sketch_error(data, sketches):
+    """The largest difference between the stats read off merged sketches and the exact ones, over every week and
+    season view of every side and player; zero, as sketches of whole yards lose nothing.
+    """
+    credited = _credited(data)
+    views = [
+        (sketches['Team'], data['Yards'], [data['Week'], data[TEAM_KEY]]),
+        (sketches['Player'], data.loc[credited, 'Yards'], [data.loc[credited, 'Week'], data.loc[credited, 'Player Involved']]),
+    ]
+    error = 0.0
+    for kind, yards, keys in views:
+        # Each week as kept, and each season as merged from the weeks
+        for merged, exact_keys in [(kind, keys), (merge_sketches(kind, kind.index.names[1]), keys[1:])]:
+            exact = exact_yardage_stats(yards, exact_keys)
+            merged_stats = yardage_stats(merged).reindex(exact.index)
+            error = max(error, float((merged_stats - exact).abs().max().max()))
+    # Averages and rates are divided in a different order, which may differ in the last bits
+    return round(error, 9)
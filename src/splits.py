@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+from src.metrics import PLAYER_TOTAL_COLUMNS
+from src.profiling import profiled
+from src.schema import METRIC_COLUMNS
+from src.setup import build_position_index
+from src.stats import PLAYER_ACTION_STATS, PLAYER_FIELD_STATS, QUARTERBACK_STATS, TEAM_STATS, evaluate_stats
+
+# The situation of a play; every stat is totalled once per combination of these, so any filter on them
+# is answered by summing the matching cells instead of scanning the plays again
+SPLIT_DIMENSIONS = ['Down', 'Yards to Go', 'Half', 'Opponent']
+
+# Columns the split cubes are built from
+SPLIT_COLUMNS = [*METRIC_COLUMNS, 'Half', 'Down', 'Yards to Go']
+
+# Longer distances share one cell, shown as MAX_DISTANCE+ to go
+MAX_DISTANCE = 20
+
+# Player stats that add up across cells ('Games Played' counts distinct weeks, so it does not)
+PLAYER_SPLIT_COLUMNS = PLAYER_TOTAL_COLUMNS[1:]
+
+
+def _situations(data):
+    # The split dimensions of each play, with the text ones as categoricals so they group by integer code
+    return pd.DataFrame({
+        'Down': data['Down'].to_numpy(dtype='int64'),
+        'Yards to Go': np.minimum(data['Yards to Go'].to_numpy(dtype='int64'), MAX_DISTANCE),
+        'Half': data['Half'].astype('category').cat.add_categories(['Unknown']).fillna('Unknown'),
+        'Opponent': data['Opponent'].astype('category').cat.add_categories(['Unknown']).fillna('Unknown'),
+    }, index=data.index)
+
+
+@profiled
+def build_split_cubes(data, position_index=None):
+    """(team cube, player cube): TEAM_STATS per situation, and the player stats per situation and player.
+
+    Needs the SPLIT_COLUMNS of the plays.
+    """
+    if position_index is None:
+        position_index = build_position_index(data)
+    situations = _situations(data)
+    plays = data.drop(columns=SPLIT_DIMENSIONS).join(situations)
+    team_cube = evaluate_stats(plays, TEAM_STATS, by=SPLIT_DIMENSIONS)
+
+    keys = [*SPLIT_DIMENSIONS, 'Player']
+    # Stats credited to the player involved in the action
+    credited = plays[plays['Player Involved'] != 'No specific player'].rename(columns={'Player Involved': 'Player'})
+    credited['Player'] = credited['Player'].astype('category')
+    action_cube = evaluate_stats(credited, PLAYER_ACTION_STATS, by=keys)
+
+    # Stats of the snaps each player was on the field for, counting a player listed twice in a lineup once
+    entries = position_index[position_index['Row'].isin(data.index)]
+    entries = pd.DataFrame({
+        'Player': entries['Player'].to_numpy(),
+        'Position': entries['Position'].to_numpy(),
+        'Row': entries['Row'].to_numpy(),
+    }).join(plays[[*SPLIT_DIMENSIONS, 'Offense/Defense', 'Yards', 'Pass Outcome']], on='Row')
+    snaps = entries.drop_duplicates(['Row', 'Player'])
+    field_cube = evaluate_stats(snaps, PLAYER_FIELD_STATS, by=keys)
+    quarterback_snaps = entries[entries['Position'] == 'Quarterback'].drop_duplicates(['Row', 'Player'])
+    field_cube = field_cube.join(evaluate_stats(quarterback_snaps, QUARTERBACK_STATS, by=keys))
+
+    player_cube = field_cube.join(action_cube, how='outer')[PLAYER_SPLIT_COLUMNS].fillna(0).astype('int64')
+    return team_cube.astype('int64'), player_cube
+
+
+def split_totals(cube, downs=None, distance=None, halves=None, opponents=None, player=None):
+    """Totals of the cube's cells in the chosen situations; None (or an empty list) keeps every value.
+
+    `distance` is a (shortest, longest) yards-to-go range, with MAX_DISTANCE standing for MAX_DISTANCE or more.
+    """
+    index = cube.index
+    keep = np.ones(len(cube), dtype=bool)
+    if downs:
+        keep &= index.get_level_values('Down').isin(downs)
+    if distance is not None:
+        yards_to_go = index.get_level_values('Yards to Go')
+        keep &= (yards_to_go >= distance[0]) & (yards_to_go <= distance[1])
+    if halves:
+        keep &= index.get_level_values('Half').isin(halves)
+    if opponents:
+        keep &= index.get_level_values('Opponent').isin(opponents)
+    if player is not None:
+        keep &= index.get_level_values('Player') == player
+    return cube[keep].sum()
+
+
+def compare_split(split, overall):
+    """The split's totals next to the totals over every situation, with the split's share of each."""
+    share = (100 * split / overall.where(overall != 0)).round(1)
+    return pd.DataFrame({'Split': split, 'All Situations': overall, 'Share (%)': share}).rename_axis('Statistic').reset_index()
@@ -0,0 +1,211 @@
+import numpy as np
+import pandas as pd
+
+# Named conditions on the plays (or on lineup entries), each evaluated at most once per pass
+# and shared by every stat that uses it
+CONDITIONS = {
+    'offense': lambda data: data['Offense/Defense'] == 'Offense',
+    'defense': lambda data: data['Offense/Defense'] == 'Defense',
+    'run': lambda data: data['Action'] == 'Run',
+    'pass_play': lambda data: data['Action'] == 'Pass',
+    'touchdown': lambda data: data['Action'] == 'Touchdown',
+    'pick_six': lambda data: data['Action'] == 'Pick-Six',
+    'interception': lambda data: data['Action'].isin(['Interception', 'Pick-Six']),
+    'flag_pull': lambda data: data['Action'] == 'Flag Pull',
+    'sack': lambda data: data['Action'] == 'Sack',
+    'conversion': lambda data: data['Action'] == 'Conversion',
+    'penalty': lambda data: data['Action'] == 'Penalty',
+    'passing_td': lambda data: data['Touchdown Type'] == 'Passing Touchdown',
+    'rushing_td': lambda data: data['Touchdown Type'] == 'Rushing Touchdown',
+    'complete_pass': lambda data: data['Pass Outcome'] == 'Complete',
+    'complete_conversion': lambda data: data['Conversion Outcome'] == 'Complete',
+    'gain': lambda data: data['Yards'] > 0,
+    'quarterback': lambda data: data['Position'] == 'Quarterback',
+    'late_down': lambda data: data['Down'] >= 3,
+    # Set by src/drives.py on plays that earned a new set of downs or scored
+    'converted': lambda data: data['Converted'],
+}
+
+# Stats are (name, predicate, aggregation): the predicate combines conditions, e.g.
+# `lambda m: m.offense & ~m.pick_six` (None counts every row), and the aggregation is
+# 'count' to count the matching rows or a column name to sum it over them
+
+# Team totals of the plays, per week on the dashboard
+TEAM_STATS = [
+    ('LA Clams Points', lambda m: m.offense & ~m.pick_six, 'Points'),
+    ('Opponent Points', lambda m: m.defense | (m.offense & m.pick_six), 'Points'),
+    ('Plays', None, 'count'),
+    ('Offensive Plays', lambda m: m.offense, 'count'),
+    ('Defensive Plays', lambda m: m.defense, 'count'),
+    ('Successful Offensive Plays', lambda m: m.offense & m.gain, 'count'),
+    ('Successful Defensive Plays', lambda m: m.defense & ~m.gain, 'count'),
+    ('Passing TDs', lambda m: m.offense & m.touchdown & m.passing_td, 'count'),
+    ('Rushing TDs', lambda m: m.offense & m.touchdown & m.rushing_td, 'count'),
+    ('Interceptions (Offense)', lambda m: m.offense & m.interception, 'count'),
+    ('Interceptions (Defense)', lambda m: m.defense & m.interception, 'count'),
+    ('Rushing Yards', lambda m: m.offense & m.rushing_td, 'Yards'),
+    ('Receiving Yards', lambda m: m.offense & m.passing_td, 'Yards'),
+    ('Flags Pulled', lambda m: m.flag_pull, 'count'),
+    ('Successful Conversions', lambda m: m.offense & m.complete_conversion, 'count'),
+    ('Attempted Conversions', lambda m: m.offense & m.conversion, 'count'),
+    ('Penalties', lambda m: m.penalty, 'count'),
+]
+
+
+def percent(part, whole):
+    """`part` as a % of `whole`, 0 when `whole` is 0; for one week's totals or for a column of weeks."""
+    if isinstance(whole, pd.Series):
+        return (part / whole * 100).where(whole > 0, 0)
+    return (part / whole) * 100 if whole > 0 else 0
+
+
+# Values derived from TEAM_STATS totals, computed the same way for one week's totals (a row) or every week (a table)
+DERIVED_TEAM_STATS = {
+    'Total TDs': lambda t: t['Passing TDs'] + t['Rushing TDs'],
+    '% Plays on Offense': lambda t: percent(t['Offensive Plays'], t['Plays']),
+    '% Successful Offensive Plays': lambda t: percent(t['Successful Offensive Plays'], t['Offensive Plays']),
+    '% Successful Defensive Plays': lambda t: percent(t['Successful Defensive Plays'], t['Defensive Plays']),
+    'Conversion Rate': lambda t: percent(t['Successful Conversions'], t['Attempted Conversions']),
+}
+
+
+def team_stat(totals, name):
+    """A TEAM_STATS total or a DERIVED_TEAM_STATS value of `totals`."""
+    if name in DERIVED_TEAM_STATS:
+        return DERIVED_TEAM_STATS[name](totals)
+    return totals[name]
+
+
+# Rows of the weekly table, after the week, opponent and outcome: (label, team stat)
+WEEK_REPORT = [
+    ('LA Clams Score', 'LA Clams Points'),
+    ('Opponent Score', 'Opponent Points'),
+    ('Total Plays', 'Plays'),
+    ('Total Offensive Plays', 'Offensive Plays'),
+    ('Total Defensive Plays', 'Defensive Plays'),
+    ('% Plays on Offense', '% Plays on Offense'),
+    ('Successful Offensive Plays', 'Successful Offensive Plays'),
+    ('% Successful Offensive Plays', '% Successful Offensive Plays'),
+    ('Successful Defensive Stops', 'Successful Defensive Plays'),
+    ('% Successful Defensive Stops', '% Successful Defensive Plays'),
+    ('Passing TDs', 'Passing TDs'),
+    ('Rushing TDs', 'Rushing TDs'),
+    ('Total TDs', 'Total TDs'),
+    ('Int (while on offense)', 'Interceptions (Offense)'),
+    ('Int (while on defense)', 'Interceptions (Defense)'),
+    ('Total Rushing Yards', 'Rushing Yards'),
+    ('Total Receiving Yards', 'Receiving Yards'),
+    ('Total Flags Pulled', 'Flags Pulled'),
+    ('Successful Conversions', 'Successful Conversions'),
+    ('Attempted Conversions', 'Attempted Conversions'),
+    ('Conversion Rate', 'Conversion Rate'),
+    ('Total Penalties', 'Penalties'),
+]
+
+# Rows of the season table, after the games played: (label, team stat) for the per-game average of a stat, or
+# (label, (numerator, denominator)) for the % of two per-game averages
+SEASON_REPORT = [
+    ('Average LA Clams Points per Game', 'LA Clams Points'),
+    ('Average Opponent Points per Game', 'Opponent Points'),
+    ('Average Total Plays per Game', 'Plays'),
+    ('Average Offensive Plays per Game', 'Offensive Plays'),
+    ('Average Defensive Plays per Game', 'Defensive Plays'),
+    ('Average % Time on Offense', '% Plays on Offense'),
+    ('Average Successful Offensive Plays per Game', 'Successful Offensive Plays'),
+    ('Average Successful Defensive Plays per Game', 'Successful Defensive Plays'),
+    ('% Successful Offensive Plays per Game', '% Successful Offensive Plays'),
+    ('% Successful Defensive Plays per Game', '% Successful Defensive Plays'),
+    ('Average Passing TDs per Game', 'Passing TDs'),
+    ('Average Rushing TDs per Game', 'Rushing TDs'),
+    ('Average Total TDs per Game', 'Total TDs'),
+    ('Average Interceptions (while on Offense) per Game', 'Interceptions (Offense)'),
+    ('Average Interceptions (while on Defense) per Game', 'Interceptions (Defense)'),
+    ('Average Rushing Yards per Game', 'Rushing Yards'),
+    ('Average Receiving Yards per Game', 'Receiving Yards'),
+    ('Average Flags Pulled per Game', 'Flags Pulled'),
+    ('Average Successful Conversions per Game', 'Successful Conversions'),
+    ('Average Attempted Conversions per Game', 'Attempted Conversions'),
+    ('Average Conversion Rate (%)', ('Successful Conversions', 'Attempted Conversions')),
+    ('Average Penalties per Game', 'Penalties'),
+]
+
+# Stats credited to the player involved in the action
+PLAYER_ACTION_STATS = [
+    ('Rushing Yards', lambda m: m.offense & m.run, 'Yards'),
+    ('Receiving Yards', lambda m: m.offense & m.pass_play, 'Yards'),
+    ('Rushing TDs', lambda m: m.offense & m.rushing_td, 'count'),
+    ('Receiving TDs', lambda m: m.offense & m.passing_td, 'count'),
+    ('Sacks', lambda m: m.defense & m.sack, 'count'),
+    # A sack also counts as a flag pull
+    ('Flags Pulled', lambda m: m.defense & (m.sack | m.flag_pull), 'count'),
+]
+
+# Stats of the snaps each player was on the field for, one row per (play, player) lineup entry
+PLAYER_FIELD_STATS = [
+    ('Offensive Plays', lambda m: m.offense, 'count'),
+    ('Defensive Plays', lambda m: m.defense, 'count'),
+    ('Successful Offensive Plays', lambda m: m.offense & m.gain, 'count'),
+    ('Successful Defensive Plays', lambda m: m.defense & ~m.gain, 'count'),
+]
+
+# Stats of the snaps each player played as quarterback
+QUARTERBACK_STATS = [
+    ('Quarterback Plays', lambda m: m.quarterback, 'count'),
+    ('Passing Yards', lambda m: m.quarterback & m.offense & m.complete_pass, 'Yards'),
+]
+
+# Totals of the plays each lineup was on the field for, from which the lineup analytics are derived
+LINEUP_STATS = [
+    ('Plays', None, 'count'),
+    ('Points For', lambda m: m.offense & ~m.pick_six, 'Points'),
+    ('Points Against', lambda m: m.defense | (m.offense & m.pick_six), 'Points'),
+    ('Successful Plays', lambda m: (m.offense & m.gain) | (m.defense & ~m.gain), 'count'),
+    ('Offensive Plays', lambda m: m.offense, 'count'),
+    ('Offensive Yards', lambda m: m.offense, 'Yards'),
+    ('Defensive Plays', lambda m: m.defense, 'count'),
+    ('Yards Allowed', lambda m: m.defense, 'Yards'),
+]
+
+
+# Totals of each drive; the conversion attempt after a score only adds its points
+DRIVE_STATS = [
+    ('Plays', lambda m: ~m.conversion, 'count'),
+    # Interception and pick-six yards are the other team's return
+    ('Yards', lambda m: ~m.conversion & ~m.interception, 'Yards'),
+    ('LA Clams Points', lambda m: m.offense & ~m.pick_six, 'Points'),
+    ('Opponent Points', lambda m: m.defense | (m.offense & m.pick_six), 'Points'),
+    ('3rd/4th Down Attempts', lambda m: m.late_down & ~m.conversion, 'count'),
+    ('3rd/4th Down Conversions', lambda m: m.late_down & ~m.conversion & m.converted, 'count'),
+]
+
+
+class Masks:
+    """The named conditions over one frame, computed on first use and then reused."""
+
+    def __init__(self, data, conditions=CONDITIONS):
+        self._data = data
+        self._conditions = conditions
+
+    def __getattr__(self, name):
+        if name.startswith('_') or name not in self._conditions:
+            raise AttributeError(name)
+        mask = self._conditions[name](self._data).to_numpy(dtype=bool)
+        setattr(self, name, mask)
+        return mask
+
+
+def evaluate_stats(data, stats, by=None, sort=True):
+    """Compute every stat over `data` in one grouped pass.
+
+    `by` is None for the team totals, or the column name(s) or Series to group by, e.g. 'Week' or ['Week', 'Player'].
+    """
+    masks = Masks(data)
+    columns = {}
+    for name, predicate, aggregation in stats:
+        mask = np.ones(len(data), dtype=bool) if predicate is None else predicate(masks)
+        columns[name] = mask if aggregation == 'count' else np.where(mask, data[aggregation].to_numpy(), 0)
+    totals = pd.DataFrame(columns, index=data.index)
+    if by is None:
+        return totals.sum()
+    keys = [data[key] if isinstance(key, str) else key for key in (by if isinstance(by, list) else [by])]
+    return totals.groupby(keys, sort=sort).sum()
@@ -0,0 +1,717 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # No flock on Windows: the thread lock below still serializes the sessions of one Streamlit server
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+from src.profiling import profiled
+from src.schema import COLUMNS, INTEGERS, apply_schema, schema_dtypes
+
+logger = logging.getLogger(__name__)
+
+# Fold the log into the base file once a read sees this many entries
+COMPACT_AFTER = 200
+
+# Where the plays live unless STATS_STORE points somewhere else
+DEFAULT_LOCATION = 'team_stats.csv'
+
+# Name of the season held by a single-file store, unless STATS_SEASON says otherwise
+DEFAULT_SEASON = 'Fall 2023'
+
+# Order of the terms within a year when sorting season names
+TERMS = ['Winter', 'Spring', 'Summer', 'Fall']
+
+# Times a read is retried when a writer replaces the files underneath it
+READ_ATTEMPTS = 5
+
+
+class WriteConflict(Exception):
+    """Raised when a write was based on a version of the plays that another writer has since changed."""
+
+
+# One lock per lock file for the threads of this process (each Streamlit session is a thread),
+# and the lock files a thread already holds, so nested writes do not wait on themselves
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+_held = threading.local()
+
+# The (Week, Play) keys of each base file, with the file version they were read at, so numbering
+# a play only re-reads the base file after it was rewritten
+_base_keys = {}
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on the file at `path`, against other threads and other processes."""
+    held = _held.__dict__.setdefault('paths', set())
+    if path in held:
+        yield
+        return
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault(path, threading.Lock())
+    with thread_lock, open(path, 'a') as lock_file:
+        if fcntl is not None:
+            # Released when the file is closed
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        held.add(path)
+        try:
+            yield
+        finally:
+            held.discard(path)
+
+
+def log_path(path):
+    """Path of the append-only play log kept next to the base file."""
+    return path + '.log'
+
+
+def _json_default(value):
+    # numpy scalars coming from pandas or Streamlit widgets
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot store {type(value).__name__} in the play log")
+
+
+def _python_value(value):
+    """Convert a cell to a plain Python value that sqlite3 can bind, with missing values as None."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _append_entry(entry, path):
+    """Write one entry to the end of the log and make sure it reached the disk."""
+    with open(log_path(path), 'a', encoding='utf-8') as log:
+        log.write(json.dumps(entry, default=_json_default) + '\n')
+        log.flush()
+        os.fsync(log.fileno())
+
+
+def _file_version(path):
+    """(mtime, size) of a file, or None when it does not exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def read_log(path):
+    """Return the entries in the log, ignoring a last line left half-written by a crash."""
+    entries = []
+    try:
+        log = open(log_path(path), encoding='utf-8')
+    except FileNotFoundError:
+        # No log yet, or a writer just folded it into the base file
+        return entries
+    with log:
+        for line in log:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            # A batch is written as one line, so it is read either whole or, after a crash, not at all
+            entries.extend(entry['entries'] if entry['op'] == 'batch' else [entry])
+    return entries
+
+
+def replay_log(base, entries):
+    """Apply the log entries, in order, on top of the plays from the base file."""
+    # Added plays and the new versions of updated plays go after the base rows
+    added = [entry['play'] for entry in entries if entry['op'] in ('add', 'update')]
+    plays = pd.concat([base, pd.DataFrame(added, columns=base.columns)], ignore_index=True) if added else base.reset_index(drop=True)
+
+    # Track the live rows for every (week, play) key so a tombstone or an update applies to the latest one
+    live = {}
+    for position, key in enumerate(zip(base['Week'], base['Play'])):
+        live.setdefault(key, []).append(position)
+    keep = np.ones(len(plays), dtype=bool)
+    # Where each row ends up: an updated play takes the place of the row it replaces
+    order = np.arange(len(plays))
+    position = len(base)
+    for entry in entries:
+        if entry['op'] == 'delete':
+            if live.get((entry['week'], entry['play'])):
+                keep[live[(entry['week'], entry['play'])].pop()] = False
+            continue
+        key = (entry['play']['Week'], entry['play']['Play'])
+        if entry['op'] == 'add':
+            live.setdefault(key, []).append(position)
+        elif live.get(key):
+            replaced = live[key].pop()
+            keep[replaced] = False
+            order[position] = order[replaced]
+            live[key].append(position)
+        else:
+            # The play was deleted, or is in a week that was not read
+            keep[position] = False
+        position += 1
+    plays = plays[keep]
+    return plays.iloc[np.argsort(order[keep], kind='stable')].reset_index(drop=True)
+
+
+def _read_columns(columns):
+    # The log is replayed by (Week, Play) key, so those are always read
+    if columns is None:
+        return None
+    return list(dict.fromkeys(['Week', 'Play', *columns]))
+
+
+def _project(data, columns, weeks):
+    """Keep only the requested weeks and columns of a frame that has already been read."""
+    if weeks is not None:
+        data = data[data['Week'].isin(weeks)].reset_index(drop=True)
+    if columns is not None:
+        data = data[list(columns)]
+    return data
+
+
+class Store:
+    """Writes shared by every backend: a lock file next to the data, and play numbers assigned under it."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def lock_path(self):
+        return self.path + '.lock'
+
+    def lock(self):
+        """Context manager serializing writers; hold it to read a version and write based on it."""
+        return file_lock(self.lock_path())
+
+    def check_version(self, expected_version):
+        """Raise WriteConflict unless the plays are still at `expected_version` (None skips the check)."""
+        if expected_version is not None and self.version() != expected_version:
+            raise WriteConflict("The plays were changed by someone else in the meantime")
+
+    def next_play(self, week):
+        """The number the next play of `week` would get: one more than the highest recorded so far."""
+        plays = self.read(columns=['Play'], weeks=[week])['Play']
+        return int(plays.max()) + 1 if len(plays) else 1
+
+    @profiled
+    def update_plays(self, plays, expected=None):
+        """Replace plays in place, matching them by their (Week, Play) key, so their order and keys are kept.
+
+        With `expected` (the same plays as they were read), raise WriteConflict instead if any of
+        them was changed or deleted since, so edits to other plays never conflict.
+        """
+        with self.lock():
+            if expected is not None and not expected.empty:
+                current = self.read(weeks=sorted({int(week) for week in expected['Week']}))
+                # The latest row with each key, as replay_log and delete pick it
+                current = current.drop_duplicates(['Week', 'Play'], keep='last').set_index(['Week', 'Play'])
+                keys = pd.MultiIndex.from_arrays([expected['Week'].astype('int64'), expected['Play'].astype('int64')])
+                if not keys.isin(current.index).all():
+                    raise WriteConflict("A play being edited was deleted by someone else in the meantime")
+                old = current.loc[keys, expected.columns.drop(['Week', 'Play'])].astype(object).to_numpy()
+                new = expected[expected.columns.drop(['Week', 'Play'])].astype(object).to_numpy()
+                if ((old != new) & ~(pd.isna(old) & pd.isna(new))).any():
+                    raise WriteConflict("A play being edited was changed by someone else in the meantime")
+            for record in plays.to_dict('records'):
+                self.update(record)
+
+    def get_play(self, week, play):
+        """The play with this (week, play) key as a dict, or None if there is none; only that week is read."""
+        plays = self.read(weeks=[week])
+        matches = plays[plays['Play'] == play]
+        if matches.empty:
+            return None
+        return {column: _python_value(value) for column, value in matches.iloc[-1].items()}
+
+    def add_play(self, record):
+        """Record a play numbered after the last play of its week, and return the number it was given.
+
+        The number is chosen and the play written under the lock, so scorekeepers entering
+        plays at the same time never get the same number or overwrite each other's plays.
+        """
+        with self.lock():
+            play = self.next_play(record['Week'])
+            self.append({**record, 'Play': play})
+        return play
+
+    def add_plays(self, records):
+        """Record several plays in one write, each numbered after the last play of its week; return their numbers.
+
+        Either every play is recorded or, if the write fails, none of them is.
+        """
+        numbers, next_numbers = [], {}
+        with self.lock():
+            for record in records:
+                week = int(record['Week'])
+                if week not in next_numbers:
+                    next_numbers[week] = self.next_play(week)
+                numbers.append(next_numbers[week])
+                next_numbers[week] += 1
+            self.append_many([{**record, 'Play': play} for record, play in zip(records, numbers)])
+        return numbers
+
+
+class LoggedFileStore(Store):
+    """A store kept as one base file plus an append-only log of added and deleted plays."""
+
+    def _read_base(self, columns, weeks):
+        raise NotImplementedError
+
+    def _write_base(self, data):
+        raise NotImplementedError
+
+    def _read_once(self, columns, weeks):
+        """Return (plays, number of log entries) from the base file and the log as they are now."""
+        if os.path.exists(self.path):
+            base = self._read_base(_read_columns(columns), weeks)
+        else:
+            base = pd.DataFrame(columns=COLUMNS)
+        entries = read_log(self.path)
+        if not entries:
+            return _project(base, columns, None), 0
+        return _project(replay_log(base, entries), columns, weeks), len(entries)
+
+    @profiled
+    def read(self, columns=None, weeks=None):
+        """Read the plays, optionally only some columns and weeks, with the log applied.
+
+        Reads take no lock: the read is retried if a writer replaced the base file or the log
+        while it was running, so a rewrite is never seen half-way through.
+        """
+        for _ in range(READ_ATTEMPTS):
+            version = self.version()
+            data, entries = self._read_once(columns, weeks)
+            if self.version() == version:
+                break
+        else:
+            with self.lock():
+                data, entries = self._read_once(columns, weeks)
+
+        # Compact only from a full read, otherwise the rewritten file would lose data
+        if entries >= COMPACT_AFTER and columns is None and weeks is None:
+            with self.lock():
+                # Read again under the lock so plays appended since are kept
+                data, entries = self._read_once(None, None)
+                self.write(data)
+        return data
+
+    def next_play(self, week):
+        """The number the next play of `week` would get, from the cached base keys and the log."""
+        version, keys = _base_keys.get(self.path, (None, None))
+        if keys is None or version != _file_version(self.path):
+            version = _file_version(self.path)
+            keys = self._read_base(['Week', 'Play'], None) if version else pd.DataFrame(columns=['Week', 'Play'])
+            _base_keys[self.path] = version, keys
+        plays = replay_log(keys[keys['Week'] == week], read_log(self.path))
+        plays = plays.loc[plays['Week'] == week, 'Play']
+        return int(plays.max()) + 1 if len(plays) else 1
+
+    @profiled
+    def append(self, record):
+        """Record a new play by appending it to the log; the base file is not rewritten."""
+        with self.lock():
+            _append_entry({'op': 'add', 'play': record}, self.path)
+            self._compact_if_long()
+
+    @profiled
+    def append_many(self, records):
+        """Record new plays by appending them to the log as a single entry, so they are added all together or not at all."""
+        with self.lock():
+            _append_entry({'op': 'batch', 'entries': [{'op': 'add', 'play': record} for record in records]}, self.path)
+            self._compact_if_long()
+
+    @profiled
+    def delete(self, week, play):
+        """Delete a play by appending a tombstone for its (week, play) key to the log."""
+        with self.lock():
+            _append_entry({'op': 'delete', 'week': week, 'play': play}, self.path)
+            self._compact_if_long()
+
+    def update(self, record):
+        """Replace the play with the record's (week, play) key by appending its new version to the log."""
+        with self.lock():
+            _append_entry({'op': 'update', 'play': record}, self.path)
+            self._compact_if_long()
+
+    def _compact_if_long(self):
+        # Admin reads one week at a time, so writers fold a long log into the base file too
+        if len(read_log(self.path)) >= COMPACT_AFTER:
+            self.write(self._read_once(None, None)[0])
+
+    def version(self):
+        """A value that changes whenever a play is added, deleted or rewritten."""
+        return _file_version(self.path), _file_version(log_path(self.path))
+
+    @profiled
+    def write(self, data, expected_version=None):
+        """Atomically replace the base file with `data` and clear the log.
+
+        With `expected_version`, raise WriteConflict instead if the plays changed since that version was read.
+        """
+        with self.lock():
+            self.check_version(expected_version)
+            self._write_base(data)
+            if os.path.exists(log_path(self.path)):
+                os.remove(log_path(self.path))
+
+
+def snapshot_path(path):
+    """Path of the binary snapshot of a CSV base file, kept next to it."""
+    return path + '.arrow'
+
+
+class CsvStore(LoggedFileStore):
+    """Plays in a CSV file, parsed once per change into a binary snapshot that later loads map instead."""
+
+    def _read_snapshot(self, columns):
+        """The requested columns from the snapshot, or None if there is none or it is older than the CSV."""
+        # pyarrow comes with pandas' Parquet support and Streamlit; it is only needed once there is a snapshot
+        import pyarrow as pa
+        import pyarrow.feather as feather
+
+        try:
+            table = feather.read_table(snapshot_path(self.path), columns=columns, memory_map=True)
+        except (FileNotFoundError, pa.ArrowInvalid, KeyError):
+            return None
+        if (table.schema.metadata or {}).get(b'source_version') != json.dumps(_file_version(self.path)).encode():
+            return None
+        return table.to_pandas()
+
+    def _write_snapshot(self, data, version):
+        import pyarrow as pa
+        import pyarrow.feather as feather
+
+        table = pa.Table.from_pandas(data, preserve_index=False)
+        # Tagged with the version of the CSV it was parsed from, so an edited CSV is parsed again
+        table = table.replace_schema_metadata({**table.schema.metadata, b'source_version': json.dumps(version).encode()})
+        # Uncompressed, so loads map the file instead of decompressing it
+        file, temporary_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix='.tmp')
+        os.close(file)
+        feather.write_feather(table, temporary_path, compression='uncompressed')
+        os.replace(temporary_path, snapshot_path(self.path))
+
+    def _read_base(self, columns, weeks):
+        data = self._read_snapshot(columns)
+        if data is None:
+            # Taken before parsing, so a CSV replaced while it is parsed leaves the snapshot out of date
+            version = _file_version(self.path)
+            data = pd.read_csv(self.path, dtype=schema_dtypes())
+            try:
+                self._write_snapshot(data, version)
+            except OSError as error:
+                # A read-only directory only costs the next load another parse
+                logger.warning("Could not write a snapshot of %s: %s", self.path, error)
+            if columns is not None:
+                data = data[columns]
+        return _project(data, None, weeks)
+
+    def _write_base(self, data):
+        temporary_path = self.path + '.tmp'
+        data.to_csv(temporary_path, index=False)
+        os.replace(temporary_path, self.path)
+
+
+class ParquetStore(LoggedFileStore):
+    """Plays in a Parquet file, so reads only decode the requested columns and weeks."""
+
+    def _read_base(self, columns, weeks):
+        filters = [('Week', 'in', list(weeks))] if weeks is not None else None
+        return pd.read_parquet(self.path, columns=columns, filters=filters)
+
+    def _write_base(self, data):
+        temporary_path = self.path + '.tmp'
+        apply_schema(data).to_parquet(temporary_path, index=False)
+        os.replace(temporary_path, self.path)
+
+
+class SqliteStore(Store):
+    """Plays in an SQLite table with a unique (Week, Play) index; lookups, appends, amends and deletes are single-row statements."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        with self._connect() as connection:
+            definitions = ', '.join(f'"{column}" {"INTEGER" if column in INTEGERS else "TEXT"}' for column in COLUMNS)
+            connection.execute(f'CREATE TABLE IF NOT EXISTS plays ({definitions})')
+            # Write counter, bumped in the same transaction as every change to the plays
+            connection.execute('CREATE TABLE IF NOT EXISTS meta (version INTEGER NOT NULL)')
+            connection.execute('INSERT INTO meta SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM meta)')
+        try:
+            with self._connect() as connection:
+                connection.execute('CREATE UNIQUE INDEX IF NOT EXISTS plays_key ON plays ("Week", "Play")')
+        except sqlite3.IntegrityError:
+            # Databases filled before the store numbered the plays may repeat a key; they keep a plain index
+            logger.warning("%s has plays sharing a (Week, Play) key; using a non-unique index", path)
+            with self._connect() as connection:
+                connection.execute('CREATE INDEX IF NOT EXISTS plays_week_play ON plays ("Week", "Play")')
+
+    @contextmanager
+    def _connect(self):
+        # Commit on success, roll back on error, and always close the connection
+        connection = sqlite3.connect(self.path)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _bump_version(self, connection):
+        connection.execute('UPDATE meta SET version = version + 1')
+
+    def version(self):
+        """The write counter, which changes whenever a play is added, deleted or rewritten."""
+        with self._connect() as connection:
+            return connection.execute('SELECT version FROM meta').fetchone()[0]
+
+    @profiled
+    def read(self, columns=None, weeks=None):
+        """Read the plays, selecting only the requested columns and weeks in SQL."""
+        selected = ', '.join(f'"{column}"' for column in (columns or COLUMNS))
+        query = f'SELECT {selected} FROM plays'
+        parameters = []
+        if weeks is not None:
+            parameters = [int(week) for week in weeks]
+            query += f' WHERE "Week" IN ({", ".join("?" * len(parameters))})'
+        with self._connect() as connection:
+            return pd.read_sql_query(query + ' ORDER BY rowid', connection, params=parameters)
+
+    def get_play(self, week, play):
+        """The play with this (week, play) key as a dict, or None, looked up through the index."""
+        selected = ', '.join(f'"{column}"' for column in COLUMNS)
+        with self._connect() as connection:
+            row = connection.execute(f'SELECT {selected} FROM plays WHERE "Week" = ? AND "Play" = ? ORDER BY rowid DESC LIMIT 1',
+                                     (int(week), int(play))).fetchone()
+        return None if row is None else dict(zip(COLUMNS, row))
+
+    def next_play(self, week):
+        """The number the next play of `week` would get: one more than the highest recorded so far."""
+        with self._connect() as connection:
+            return connection.execute('SELECT COALESCE(MAX("Play"), 0) + 1 FROM plays WHERE "Week" = ?', (int(week),)).fetchone()[0]
+
+    @profiled
+    def append(self, record):
+        """Insert one play."""
+        values = [_python_value(record.get(column)) for column in COLUMNS]
+        with self.lock(), self._connect() as connection:
+            connection.execute(f'INSERT INTO plays VALUES ({", ".join("?" * len(COLUMNS))})', values)
+            self._bump_version(connection)
+
+    @profiled
+    def append_many(self, records):
+        """Insert several plays in one transaction."""
+        rows = [[_python_value(record.get(column)) for column in COLUMNS] for record in records]
+        with self.lock(), self._connect() as connection:
+            connection.executemany(f'INSERT INTO plays VALUES ({", ".join("?" * len(COLUMNS))})', rows)
+            self._bump_version(connection)
+
+    @profiled
+    def delete(self, week, play):
+        """Delete the most recently inserted play with this (week, play) key."""
+        with self.lock(), self._connect() as connection:
+            connection.execute('DELETE FROM plays WHERE rowid = (SELECT MAX(rowid) FROM plays WHERE "Week" = ? AND "Play" = ?)',
+                               (int(week), int(play)))
+            self._bump_version(connection)
+
+    def update(self, record):
+        """Overwrite the most recently inserted play with the record's (week, play) key, keeping its rowid."""
+        assignments = ', '.join(f'"{column}" = ?' for column in COLUMNS)
+        values = [_python_value(record.get(column)) for column in COLUMNS]
+        with self.lock(), self._connect() as connection:
+            connection.execute(f'UPDATE plays SET {assignments} WHERE rowid = (SELECT MAX(rowid) FROM plays WHERE "Week" = ? AND "Play" = ?)',
+                               values + [int(record['Week']), int(record['Play'])])
+            self._bump_version(connection)
+
+    @profiled
+    def write(self, data, expected_version=None):
+        """Replace every play with `data` in one transaction, unless the plays changed since `expected_version`."""
+        rows = [[_python_value(value) for value in row] for row in data.reindex(columns=COLUMNS).itertuples(index=False)]
+        with self.lock(), self._connect() as connection:
+            self.check_version(expected_version)
+            connection.execute('DELETE FROM plays')
+            connection.executemany(f'INSERT INTO plays VALUES ({", ".join("?" * len(COLUMNS))})', rows)
+            self._bump_version(connection)
+
+
+class SeasonStore(Store):
+    """One season of a partitioned store: a directory holding one Parquet partition (and log) per week."""
+
+    def lock_path(self):
+        # Kept inside the season directory, where it is not mistaken for a season or a partition
+        os.makedirs(self.path, exist_ok=True)
+        return os.path.join(self.path, 'season.lock')
+
+    def partition(self, week):
+        """The store holding a single week of this season."""
+        return ParquetStore(os.path.join(self.path, f'week={int(week)}.parquet'))
+
+    def weeks(self):
+        """Weeks that have a partition, in order, without reading any of them."""
+        if not os.path.isdir(self.path):
+            return []
+        found = {int(match.group(1)) for match in map(re.compile(r'^week=(\d+)\.parquet(\.log)?$').match, os.listdir(self.path)) if match}
+        return sorted(found)
+
+    def partitions(self, weeks=None):
+        """Stores for the requested weeks (all weeks by default) that have data."""
+        existing = self.weeks()
+        return [self.partition(week) for week in existing if weeks is None or week in weeks]
+
+    def version(self):
+        """The (week, version) of every partition, so changing one week changes the season's version."""
+        return [[week, self.partition(week).version()] for week in self.weeks()]
+
+    @profiled
+    def read(self, columns=None, weeks=None):
+        """Read only the partitions of the requested weeks, and only the requested columns of them."""
+        frames = [partition.read(columns) for partition in self.partitions(weeks)]
+        if not frames:
+            return pd.DataFrame(columns=columns or COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+    def next_play(self, week):
+        """The number the next play of `week` would get, from that week's partition alone."""
+        return self.partition(week).next_play(week)
+
+    @profiled
+    def append(self, record):
+        """Append a play to its week's partition log."""
+        with self.lock():
+            self.partition(record['Week']).append(record)
+
+    @profiled
+    def append_many(self, records):
+        """Append each week's plays to its partition log in one entry; plays of several weeks are written week by week."""
+        with self.lock():
+            weeks = {}
+            for record in records:
+                weeks.setdefault(int(record['Week']), []).append(record)
+            for week, plays in weeks.items():
+                self.partition(week).append_many(plays)
+
+    @profiled
+    def delete(self, week, play):
+        """Append a tombstone to the week's partition log."""
+        with self.lock():
+            self.partition(week).delete(week, play)
+
+    def update(self, record):
+        """Append the play's new version to its week's partition log."""
+        with self.lock():
+            self.partition(record['Week']).update(record)
+
+    @profiled
+    def write(self, data, expected_version=None):
+        """Replace the season with `data`, one partition per week, dropping weeks that are no longer present."""
+        with self.lock():
+            self.check_version(expected_version)
+            weeks = set()
+            for week, plays in data.groupby('Week', sort=False):
+                self.partition(week).write(plays)
+                weeks.add(int(week))
+            for week in set(self.weeks()) - weeks:
+                for path in _partition_files(self.partition(week).path):
+                    os.remove(path)
+
+
+def _partition_files(path):
+    """The base file of a partition together with its log and any sidecar files."""
+    directory, name = os.path.split(path)
+    return [os.path.join(directory, file) for file in os.listdir(directory) if file == name or file.startswith(name + '.')]
+
+
+class PartitionedStore:
+    """Plays for many seasons under one directory: <root>/<season>/week=<n>.parquet."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def seasons(self):
+        """Season names, oldest first."""
+        if not os.path.isdir(self.path):
+            return []
+        names = [name for name in os.listdir(self.path) if os.path.isdir(os.path.join(self.path, name))]
+        return sorted(names, key=season_sort_key)
+
+    def season(self, name):
+        """The store for one season; it is created on the first write."""
+        return SeasonStore(os.path.join(self.path, name))
+
+
+def season_sort_key(name):
+    """Sort 'Fall 2023' after 'Spring 2023' and before 'Spring 2024'; unknown names sort by text."""
+    year = re.search(r'(\d{4})', name)
+    term = next((index for index, term in enumerate(TERMS) if term.lower() in name.lower()), len(TERMS))
+    return (int(year.group(1)) if year else 0, term, name)
+
+
+def diff_plays(before, after):
+    """Return (removed, added): the rows of `before` that were changed or dropped, and their replacements in `after`."""
+    common = before.index.intersection(after.index)
+    old, new = before.loc[common], after.loc[common, before.columns]
+    changed = ((old != new) & ~(old.isna() & new.isna())).any(axis=1)
+    removed = pd.concat([old[changed], before.loc[before.index.difference(after.index)]])
+    added = pd.concat([new[changed], after.loc[after.index.difference(before.index), before.columns]])
+    return removed, added
+
+
+def open_store(location=None):
+    """Open the store at `location` (or $STATS_STORE), choosing the backend from the file extension.
+
+    A directory (or a path without an extension) is a partitioned, multi-season store.
+    """
+    location = location or os.environ.get('STATS_STORE', DEFAULT_LOCATION)
+    extension = os.path.splitext(location)[1].lower()
+    if os.path.isdir(location) or not extension:
+        return PartitionedStore(location)
+    if extension == '.csv':
+        return CsvStore(location)
+    if extension == '.parquet':
+        return ParquetStore(location)
+    if extension in ('.sqlite', '.sqlite3', '.db'):
+        return SqliteStore(location)
+    raise ValueError(f"Don't know how to store plays in '{location}'")
+
+
+def list_seasons(location=None):
+    """Seasons available in the store; a single-file store holds just one."""
+    store = open_store(location)
+    if isinstance(store, PartitionedStore) and store.seasons():
+        return store.seasons()
+    return [os.environ.get('STATS_SEASON', DEFAULT_SEASON)]
+
+
+def open_season(season=None, location=None):
+    """The store for one season; single-file stores ignore the season name."""
+    store = open_store(location)
+    if isinstance(store, PartitionedStore):
+        return store.season(season or list_seasons(location)[-1])
+    return store
+
+
+@profiled
+def load_team_stats(store=None, columns=None, weeks=None):
+    """Load the plays with explicit dtypes and report how long it took and how much memory it uses."""
+    if store is None or isinstance(store, str):
+        store = open_season(location=store)
+    start = time.perf_counter()
+    data = apply_schema(store.read(columns, weeks))
+    parse_seconds = time.perf_counter() - start
+
+    report = {
+        'rows': len(data),
+        'parse_seconds': parse_seconds,
+        'memory_bytes': int(data.memory_usage(deep=True).sum()),
+    }
+    logger.info("Loaded %d plays from %s in %.1f ms (%.1f KB in memory)",
+                report['rows'], store.path, parse_seconds * 1000, report['memory_bytes'] / 1024)
+    return data, report
@@ -0,0 +1,196 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from src.schema import COLUMNS, apply_schema
+from src.setup import get_players
+from src.storage import TERMS, PartitionedStore, open_store
+
+# Action mix per side, roughly matching the recorded games
+ACTIONS = {
+    'Offense': (['Pass', 'Run', 'Touchdown', 'Conversion', 'Interception', 'Pick-Six', 'Penalty'],
+                [0.50, 0.17, 0.12, 0.11, 0.04, 0.02, 0.04]),
+    'Defense': (['Pass', 'Run', 'Flag Pull', 'Touchdown', 'Conversion', 'Interception', 'Sack', 'Forced Fumble', 'Penalty'],
+                [0.35, 0.05, 0.30, 0.08, 0.09, 0.05, 0.03, 0.02, 0.03]),
+}
+
+# Positions handed out to the seven players of a lineup
+LINEUP_POSITIONS = {
+    'Offense': ['Quarterback', 'Center', 'Wide Receiver', 'Wide Receiver', 'Wide Receiver', 'Running Back', 'Tight End'],
+    'Defense': ['Pass Rusher', 'Pass Rusher', 'Corner Back', 'Corner Back', 'Safety', 'Safety', 'Safety'],
+}
+
+# Actions credited to a player on the field rather than to 'No specific player'
+CREDITED_ACTIONS = {
+    'Offense': ['Pass', 'Run', 'Touchdown', 'Conversion'],
+    'Defense': ['Flag Pull', 'Interception', 'Sack', 'Forced Fumble'],
+}
+
+OPPONENTS = ['Green Gay Packers', 'Gaytriots', 'Queer Eagles', 'Dallas Cowgirls', 'Kansas City Queens',
+             'Bay Area Bears', 'Lambda Lions', 'Pride Panthers', 'Rainbow Raiders', 'Sequin Seahawks']
+
+# Lineups are drawn from a small pool, the way a coach rotates a few groups
+LINEUP_POOL_SIZE = 48
+
+
+def _lineup_pool(rng, side, roster):
+    """Build a pool of lineups for one side: the 'Players on Field' and 'Player Positions' strings."""
+    players_on_field, player_positions, members = [], [], []
+    for _ in range(LINEUP_POOL_SIZE):
+        chosen = rng.choice(len(roster), size=7, replace=False)
+        positions = rng.permutation(LINEUP_POSITIONS[side])
+        names = [roster[index] for index in chosen]
+        players_on_field.append(', '.join(names))
+        player_positions.append(', '.join(f"{name} as {position}" for name, position in zip(names, positions)))
+        # Keep the non-quarterback players first so credited actions skip the quarterback
+        members.append([name for name, position in zip(names, positions) if position != 'Quarterback'][:6])
+    return np.array(players_on_field, dtype=object), np.array(player_positions, dtype=object), np.array(members, dtype=object)
+
+
+def generate_season(plays, weeks=10, seed=0, roster=None):
+    """Generate one season of `plays` plays spread over `weeks` games, in the team_stats.csv schema."""
+    rng = np.random.default_rng(seed)
+    roster = list(roster or get_players())
+    weeks = max(1, min(weeks, plays))
+
+    # Week and play number: plays are split evenly over the games and numbered from 1 within each
+    week = np.repeat(np.arange(1, weeks + 1), np.diff(np.linspace(0, plays, weeks + 1).astype(int)))
+    starts = np.searchsorted(week, week, side='left')
+    play = np.arange(plays) - starts + 1
+    week_sizes = np.bincount(week)[week]
+    half = np.where(play <= week_sizes // 2, '1st', '2nd')
+
+    # Possessions alternate between offense and defense every few plays
+    drive_lengths = rng.geometric(1 / 6, size=plays)
+    drive = np.repeat(np.arange(plays), drive_lengths)[:plays]
+    side = np.where((drive + week) % 2 == 0, 'Offense', 'Defense')
+    on_offense = side == 'Offense'
+
+    # Actions, lineups and the player credited with each action
+    action = np.empty(plays, dtype=object)
+    players_on_field = np.empty(plays, dtype=object)
+    player_positions = np.empty(plays, dtype=object)
+    player_involved = np.full(plays, 'No specific player', dtype=object)
+    for name, rows in (('Offense', on_offense), ('Defense', ~on_offense)):
+        count = int(rows.sum())
+        actions, weights = ACTIONS[name]
+        action[rows] = rng.choice(actions, size=count, p=weights)
+        pool_players, pool_positions, pool_members = _lineup_pool(rng, name, roster)
+        lineup = rng.integers(0, LINEUP_POOL_SIZE, size=plays)[drive][rows]
+        players_on_field[rows] = pool_players[lineup]
+        player_positions[rows] = pool_positions[lineup]
+        member = rng.integers(0, 6, size=count)
+        credited = np.isin(action[rows], CREDITED_ACTIONS[name])
+        chosen = player_involved[rows]
+        chosen[credited] = pool_members[lineup[credited], member[credited]]
+        player_involved[rows] = chosen
+
+    # Outcomes that depend on the action
+    is_pass = action == 'Pass'
+    is_touchdown = action == 'Touchdown'
+    is_conversion = action == 'Conversion'
+    pass_complete = rng.random(plays) < np.where(on_offense, 0.45, 0.2)
+    pass_outcome = np.where(is_pass, np.where(pass_complete, 'Complete', 'Incomplete'), None)
+    touchdown_type = np.where(is_touchdown, np.where(rng.random(plays) < 0.6, 'Passing Touchdown', 'Rushing Touchdown'), None)
+    conversion_complete = rng.random(plays) < 0.5
+    conversion_outcome = np.where(is_conversion, np.where(conversion_complete, 'Complete', 'Incomplete'), None)
+    two_point = rng.random(plays) < 0.4
+
+    yards = np.zeros(plays)
+    yards = np.where(is_pass & pass_complete, rng.normal(8, 6, plays), yards)
+    yards = np.where(action == 'Run', rng.normal(5, 4, plays), yards)
+    yards = np.where(is_touchdown, rng.integers(5, 41, plays), yards)
+    yards = np.where(action == 'Flag Pull', rng.integers(0, 21, plays), yards)
+    yards = np.where(action == 'Interception', rng.integers(0, 21, plays), yards)
+    yards = np.where(action == 'Penalty', -5, yards)
+    yards = np.clip(np.round(yards), -100, 100).astype(int)
+
+    # Same scoring as calculate_points in src/bulk_import.py
+    points = np.where(is_touchdown | (action == 'Pick-Six'), 6, 0)
+    points = np.where(is_conversion & conversion_complete, np.where(two_point, 2, 1), points)
+
+    data = pd.DataFrame({
+        'Week': week,
+        'Opponent': np.array(OPPONENTS, dtype=object)[(week - 1 + seed) % len(OPPONENTS)],
+        'Half': half,
+        'Down': rng.choice([1, 2, 3, 4], size=plays, p=[0.7, 0.15, 0.1, 0.05]),
+        'Yards to Go': rng.integers(1, 11, size=plays),
+        'Play': play,
+        'Offense/Defense': side,
+        'Players on Field': players_on_field,
+        'Player Positions': player_positions,
+        'Action': action,
+        'Player Involved': player_involved,
+        'Touchdown Type': touchdown_type,
+        'Pass Outcome': pass_outcome,
+        'Conversion Outcome': conversion_outcome,
+        'Yards': yards,
+        'Points': points,
+        'Notes': None,
+    }, columns=COLUMNS)
+    return apply_schema(data)
+
+
+def season_name(index, first_year=2000):
+    """'Winter 2000', 'Spring 2000', ... for the index-th generated season."""
+    return f"{TERMS[index % len(TERMS)]} {first_year + index // len(TERMS)}"
+
+
+def generate_seasons(rows, seasons=1, weeks=10, seed=0):
+    """Yield (season name, plays) for `seasons` seasons holding `rows` plays between them."""
+    sizes = np.diff(np.linspace(0, rows, seasons + 1).astype(int))
+    for index, plays in enumerate(sizes):
+        yield season_name(index), generate_season(int(plays), weeks=weeks, seed=seed + index)
+
+
+def write_synthetic_store(location, rows, seasons=1, weeks=10, seed=0):
+    """Fill a store with generated plays; a directory store gets one partition per season and week.
+
+    A single-file store holds one season, as its plays are keyed by (Week, Play) alone, so more seasons need a directory.
+    """
+    store = open_store(location)
+    if isinstance(store, PartitionedStore):
+        for name, plays in generate_seasons(rows, seasons, weeks, seed):
+            store.season(name).write(plays)
+            check_round_trip(store.season(name), plays)
+    elif seasons > 1:
+        raise ValueError(f"'{location}' holds a single season; write {seasons} seasons to a directory instead")
+    else:
+        _, plays = next(generate_seasons(rows, seasons, weeks, seed))
+        store.write(plays)
+        check_round_trip(open_store(location), plays)
+    return store
+
+
+def check_round_trip(store, plays):
+    """Raise ValueError unless reading `store` back gives the generated `plays`, value for value."""
+    def values(data):
+        # Backends may bring an empty column back as another type, so compare values with missing ones as None
+        data = data.sort_values(['Week', 'Play'], ignore_index=True).astype(object)
+        return data.where(data.notna(), None)
+
+    try:
+        pd.testing.assert_frame_equal(values(apply_schema(store.read())), values(plays))
+    except AssertionError as error:
+        raise ValueError(f"The plays read back from '{store.path}' differ from the generated ones: {error}") from None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic play logs in the team_stats.csv schema.")
+    parser.add_argument('target', help="Store to write, e.g. synthetic.csv, synthetic.parquet or a seasons directory")
+    parser.add_argument('--rows', type=int, default=100_000, help="Total number of plays")
+    parser.add_argument('--seasons', type=int, default=1, help="Number of seasons to spread the plays over")
+    parser.add_argument('--weeks', type=int, default=10, help="Games per season")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        write_synthetic_store(args.target, args.rows, args.seasons, args.weeks, args.seed)
+    except ValueError as error:
+        parser.error(str(error))
+    print(f"Wrote {args.rows} plays over {args.seasons} season(s) to {args.target}")
+
+
+if __name__ == "__main__":
+    main()